@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark rejestracji wielu klientów
+
+Porównuje rejestrację pojedynczą (/api/auth/register, żądanie na klienta)
+z importem wsadowym (/api/auth/register/bulk, jedno żądanie JSON lub CSV).
+
+Koszt hashowania scrypt dominuje przy jawnych sekretach; --prehashed wysyła
+gotowe hashe i mierzy samą ścieżkę bazodanową. Wyniki dla jawnych sekretów
+podawać przy produkcyjnych parametrach scrypt (domyślne SCRYPT_N serwera) -
+obniżone SCRYPT_N ukrywa czas hashowania.
+
+Użycie:
+    python3 benchmarks/bulk_register.py --count 10000 --mode bulk --format csv --prehashed
+    python3 benchmarks/bulk_register.py --count 500 --mode single --concurrency 20
+"""
+import argparse
+import asyncio
+import csv
+import importlib
+import io
+import os
+import sys
+import time
+import uuid
+
+import httpx
+
+
+def precomputed_hash(secret: str) -> str:
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+    security = importlib.import_module("crypto-server.security")
+    return security.hash_secret(secret)
+
+
+def build_rows(args):
+    prefix = f"bench-{uuid.uuid4().hex[:8]}"
+    secret_hash = precomputed_hash(args.secret) if args.prehashed else None
+
+    rows = []
+    for i in range(args.count):
+        row = {"client_id": f"{prefix}-{i:06d}", "app_name": f"Bench App {i}"}
+        if secret_hash:
+            row["client_secret_hash"] = secret_hash
+        else:
+            row["client_secret"] = args.secret
+        rows.append(row)
+    return rows
+
+
+async def run_bulk(http, args, rows):
+    headers = {"X-Admin-Secret": args.admin_secret}
+    if args.format == "csv":
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+        headers["Content-Type"] = "text/csv"
+        content = buffer.getvalue().encode("utf-8")
+        request = http.post(f"{args.server}/api/auth/register/bulk", content=content, headers=headers)
+    else:
+        request = http.post(f"{args.server}/api/auth/register/bulk", json={"clients": rows}, headers=headers)
+
+    start = time.perf_counter()
+    response = await request
+    elapsed = time.perf_counter() - start
+    response.raise_for_status()
+
+    result = response.json()
+    return elapsed, result["inserted"], len(result["conflicts"]) + len(result["errors"])
+
+
+async def run_single(http, args, rows):
+    queue = asyncio.Queue()
+    for row in rows:
+        queue.put_nowait(row)
+    failures = []
+
+    async def worker():
+        while True:
+            try:
+                row = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            response = await http.post(
+                f"{args.server}/api/auth/register",
+                json={"client_id": row["client_id"], "client_secret": args.secret, "app_name": row["app_name"]},
+                headers={"X-Admin-Secret": args.admin_secret},
+            )
+            if response.status_code != 200:
+                failures.append(response.status_code)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+    elapsed = time.perf_counter() - start
+    return elapsed, len(rows) - len(failures), len(failures)
+
+
+async def main(args):
+    rows = build_rows(args)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=None, limits=limits) as http:
+        if args.mode == "bulk":
+            elapsed, inserted, rejected = await run_bulk(http, args, rows)
+        else:
+            elapsed, inserted, rejected = await run_single(http, args, rows)
+
+    print("=" * 60)
+    print(f"📥 Rejestracja {args.count} klientów ({args.mode}, {args.format if args.mode == 'bulk' else 'json'}"
+          f"{', gotowe hashe' if args.prehashed else ''})")
+    print("=" * 60)
+    print(f"   Czas:           {elapsed:10.2f} s")
+    print(f"   Klientów/s:     {inserted / elapsed:10.1f}")
+    print(f"   Zarejestrowano: {inserted:10d}")
+    print(f"   Odrzucono:      {rejected:10d}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark rejestracji klientów")
+    parser.add_argument("--server", default="http://localhost:8000")
+    parser.add_argument("--admin-secret", default="super-secret-admin-key")
+    parser.add_argument("--secret", default="bench-secret")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--mode", choices=["bulk", "single"], default="bulk")
+    parser.add_argument("--format", choices=["json", "csv"], default="json")
+    parser.add_argument("--prehashed", action="store_true")
+    parser.add_argument("--concurrency", type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
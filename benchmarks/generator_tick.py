@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark ticku generatora kursów
+
+Mierzy czas jednego ticku w zależności od liczby walut:
+  - orm:        dawny tryb - obiekty ORM, pętla w Pythonie, UPDATE na wiersz przy flush
+  - vectorized: tasks.RateWalk (NumPy) + jeden UPDATE ... FROM unnest(...)
+  - full:       vectorized + historia ticków i świece (history.record_ticks), czyli pełny tick
+
+Waluty testowe (prefiks BENCH-) są dodawane w transakcji, która na końcu jest
+wycofywana - baza i działający serwer nie widzą żadnych zmian. Czas nie
+obejmuje COMMIT (fsync), który jest stały niezależnie od trybu.
+
+Użycie:
+    python3 benchmarks/generator_tick.py --symbols 13,1000,10000 --ticks 20
+"""
+import argparse
+import asyncio
+import importlib
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+PREFIX = "BENCH-"
+
+
+def load_server():
+    database = importlib.import_module("crypto-server.database")
+    # Logowanie każdego zapytania zdominowałoby pomiar
+    database.engine.sync_engine.echo = False
+    models = importlib.import_module("crypto-server.models")
+    tasks = importlib.import_module("crypto-server.tasks")
+    return database, models, tasks
+
+
+async def seed(db, models, count):
+    from sqlalchemy.dialects.postgresql import insert
+
+    rows = [
+        {"symbol": f"{PREFIX}{i:05d}", "rate": random.uniform(0.01, 50000), "open_price": None, "change_24h": 0.0}
+        for i in range(count)
+    ]
+    # 4 parametry na wiersz - porcje mieszczą się w limicie parametrów asyncpg
+    for start in range(0, len(rows), 5000):
+        await db.execute(insert(models.CurrencyRate).values(rows[start:start + 5000]))
+    await db.flush()
+
+
+async def tick_orm(db, models, tasks):
+    from sqlalchemy.future import select
+
+    result = await db.execute(select(models.CurrencyRate).where(models.CurrencyRate.symbol.startswith(PREFIX)))
+    now = datetime.now(timezone.utc)
+    for currency in result.scalars().all():
+        if currency.open_price is None:
+            currency.open_price = currency.rate
+        currency.rate = currency.rate * (1 + random.uniform(-0.005, 0.005))
+        if currency.open_price > 0:
+            currency.change_24h = ((currency.rate - currency.open_price) / currency.open_price) * 100
+        currency.last_updated = now
+    await db.flush()
+
+
+async def measure(tick, ticks):
+    timings = []
+    for _ in range(ticks):
+        start = time.perf_counter()
+        await tick()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), max(timings)
+
+
+async def run(count, args, database, models, tasks):
+    results = {}
+    async with database.AsyncSessionLocal() as db:
+        await seed(db, models, count)
+
+        if "orm" in args.modes:
+            results["orm"] = await measure(lambda: tick_orm(db, models, tasks), args.ticks)
+        # ORM trzyma obiekty w sesji - odłączamy je, żeby nie wpływały na kolejne tryby
+        db.expunge_all()
+
+        walk = await tasks.load_rate_walk(db, PREFIX)
+
+        async def tick_vectorized():
+            now = datetime.now(timezone.utc)
+            walk.step(now.timestamp())
+            await db.execute(tasks.BULK_UPDATE_RATES, {
+                "ts": now,
+                "symbols": walk.symbols,
+                "rates": walk.rates.tolist(),
+                "open_prices": walk.open_prices.tolist(),
+                "changes": walk.change_24h.tolist(),
+            })
+
+        async def tick_full():
+            now = datetime.now(timezone.utc)
+            walk.step(now.timestamp())
+            await tasks.write_tick(db, walk, now)
+
+        if "vectorized" in args.modes:
+            results["vectorized"] = await measure(tick_vectorized, args.ticks)
+        if "full" in args.modes:
+            results["full"] = await measure(tick_full, args.ticks)
+
+        await db.rollback()
+    return results
+
+
+async def main(args):
+    database, models, tasks = load_server()
+    counts = [int(count) for count in args.symbols.split(",")]
+
+    print("=" * 60)
+    print(f"⏱️  Czas ticku generatora (mediana / maks. z {args.ticks} ticków, ms)")
+    print("=" * 60)
+    print(f"   {'Waluty':>8} " + " ".join(f"{mode:>22}" for mode in args.modes))
+    for count in counts:
+        results = await run(count, args, database, models, tasks)
+        cells = [f"{results[mode][0]:10.1f} / {results[mode][1]:9.1f}" for mode in args.modes]
+        print(f"   {count:>8} " + " ".join(cells))
+
+    await database.engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ticku generatora kursów")
+    parser.add_argument("--symbols", default="13,1000,10000", help="Liczby walut oddzielone przecinkami")
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--modes", default="orm,vectorized,full",
+                        type=lambda value: [mode for mode in value.split(",") if mode])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Mikrobenchmark serializacji listy kursów
+
+Porównuje trzy ścieżki budowania treści odpowiedzi /api/currency/:
+  - response_model: CurrencyResponse na wiersz, a potem walidacja i serializacja
+                    całej listy przez FastAPI (response_model=List[CurrencyResponse])
+  - pydantic_rows:  CurrencyResponse.model_dump_json() na wiersz, sklejane bajty
+  - orjson:         currency.encode_rate - słownik wprost do JSON przez orjson
+
+Przed pomiarem sprawdza, że wszystkie ścieżki dają identyczny JSON, a orjson
+te same bajty co model_dump_json.
+Nie wymaga bazy ani działającego serwera.
+
+Użycie:
+    python3 benchmarks/serialization.py --symbols 13,1000,10000
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def build_rows(currency, count):
+    names = list(currency.CURRENCY_NAMES)
+    now = datetime.now(timezone.utc)
+    return [
+        SimpleNamespace(
+            symbol=names[i] if i < len(names) else f"SYM{i:05d}",
+            rate=random.uniform(0.01, 50000),
+            change_24h=random.uniform(-10, 10),
+            last_updated=now,
+        )
+        for i in range(count)
+    ]
+
+
+def response_model_path(currency):
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+
+    field = create_response_field(name="response", type_=List[currency.CurrencyResponse])
+    loop = asyncio.new_event_loop()
+
+    def encode(rows):
+        content = [currency.map_currency_to_response(row) for row in rows]
+        serialized = loop.run_until_complete(serialize_response(field=field, response_content=content, is_coroutine=True))
+        return JSONResponse(serialized).body
+
+    return encode
+
+
+def pydantic_rows_path(currency):
+    def encode(rows):
+        return b"[" + b",".join(currency.map_currency_to_response(row).model_dump_json().encode() for row in rows) + b"]"
+
+    return encode
+
+
+def orjson_path(currency):
+    def encode(rows):
+        return b"[" + b",".join(
+            currency.encode_rate(row.symbol, row.rate, row.change_24h, row.last_updated) for row in rows
+        ) + b"]"
+
+    return encode
+
+
+def measure(encode, rows, min_seconds):
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        encode(rows)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / runs * 1000
+
+
+def main(args):
+    currency = importlib.import_module("crypto-server.currency")
+    paths = {
+        "response_model": response_model_path(currency),
+        "pydantic_rows": pydantic_rows_path(currency),
+        "orjson": orjson_path(currency),
+    }
+
+    print("=" * 60)
+    print("🧪 Serializacja listy kursów (ms na odpowiedź)")
+    print("=" * 60)
+    print(f"   {'Waluty':>8} " + " ".join(f"{name:>15}" for name in paths) + f" {'przyspieszenie':>15}")
+    for count in [int(count) for count in args.symbols.split(",")]:
+        rows = build_rows(currency, count)
+
+        bodies = {name: encode(rows) for name, encode in paths.items()}
+        reference = json.loads(bodies["response_model"])
+        for name, body in bodies.items():
+            if json.loads(body) != reference:
+                raise SystemExit(f"❌ Ścieżka {name} zwraca inny JSON niż response_model")
+        # Snapshot dotąd składał się z wierszy Pydantic - nowe wiersze muszą być z nimi identyczne co do bajtu
+        if bodies["orjson"] != bodies["pydantic_rows"]:
+            raise SystemExit("❌ orjson zwraca inne bajty niż model_dump_json")
+
+        timings = {name: measure(encode, rows, args.seconds) for name, encode in paths.items()}
+        speedup = timings["response_model"] / timings["orjson"]
+        print(f"   {count:>8} " + " ".join(f"{timings[name]:15.3f}" for name in paths) + f" {speedup:14.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mikrobenchmark serializacji kursów")
+    parser.add_argument("--symbols", default="13,1000,10000", help="Liczby walut oddzielone przecinkami")
+    parser.add_argument("--seconds", type=float, default=1.0, help="Minimalny czas pomiaru na ścieżkę")
+    main(parser.parse_args())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark endpointu /api/auth/token
+
+Wysyła serię żądań o token przy zadanej współbieżności i równolegle
+sonduje /health, żeby pokazać czy weryfikacja sekretów blokuje pętlę zdarzeń.
+
+Porównanie "przed / po" (serwer uruchamiany z różnymi zmiennymi środowiskowymi):
+    HASH_WORKERS=0 VERIFIED_CACHE_TTL=0   - scrypt w pętli zdarzeń, bez cache
+    VERIFIED_CACHE_TTL=0                  - scrypt w puli wątków, bez cache
+    (domyślnie)                           - pula wątków + cache zweryfikowanych sekretów
+
+Klient benchmarku dostaje token_limit_per_minute=0 (bez limitu wydawania tokenów).
+
+Użycie:
+    python3 benchmarks/token_throughput.py --requests 500 --concurrency 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+async def ensure_client(http, args):
+    response = await http.post(
+        f"{args.server}/api/auth/register",
+        json={"client_id": args.client_id, "client_secret": args.client_secret, "app_name": "Benchmark"},
+        headers={"X-Admin-Secret": args.admin_secret},
+    )
+    if response.status_code not in (200, 400):
+        response.raise_for_status()
+
+    # Bez limitu wydawania tokenów (domyślnie TOKEN_LIMIT_PER_MINUTE=10) prawie wszystkie żądania
+    # skończyłyby się 429 i mierzylibyśmy odrzucenia zamiast weryfikacji sekretów
+    response = await http.patch(
+        f"{args.server}/api/auth/clients/{args.client_id}",
+        json={"token_limit_per_minute": 0},
+        headers={"X-Admin-Secret": args.admin_secret},
+    )
+    response.raise_for_status()
+
+
+async def token_worker(http, args, queue, latencies, errors):
+    while True:
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        start = time.perf_counter()
+        response = await http.post(
+            f"{args.server}/api/auth/token",
+            json={"client_id": args.client_id, "client_secret": args.client_secret},
+        )
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            errors.append(response.status_code)
+
+
+async def health_probe(http, args, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await http.get(f"{args.server}/health")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01)
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.concurrency + 1)
+    async with httpx.AsyncClient(timeout=60.0, limits=limits) as http:
+        await ensure_client(http, args)
+
+        queue = asyncio.Queue()
+        for _ in range(args.requests):
+            queue.put_nowait(None)
+
+        token_latencies, health_latencies, errors = [], [], []
+        stop = asyncio.Event()
+        probe = asyncio.create_task(health_probe(http, args, stop, health_latencies))
+
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            token_worker(http, args, queue, token_latencies, errors)
+            for _ in range(args.concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        await probe
+
+    print("=" * 60)
+    print(f"🔑 /api/auth/token: {args.requests} żądań, współbieżność {args.concurrency}")
+    print("=" * 60)
+    print(f"   Przepustowość:  {args.requests / elapsed:10.1f} req/s")
+    print(f"   Latencja p50:   {percentile(token_latencies, 0.50) * 1000:10.1f} ms")
+    print(f"   Latencja p99:   {percentile(token_latencies, 0.99) * 1000:10.1f} ms")
+    print(f"   Błędy:          {len(errors):10d}")
+    if health_latencies:
+        print(f"   /health p50:    {statistics.median(health_latencies) * 1000:10.1f} ms")
+        print(f"   /health p99:    {percentile(health_latencies, 0.99) * 1000:10.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark endpointu tokenów")
+    parser.add_argument("--server", default="http://localhost:8000")
+    parser.add_argument("--admin-secret", default="super-secret-admin-key")
+    parser.add_argument("--client-id", default="bench-token-client")
+    parser.add_argument("--client-secret", default="bench-token-secret")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -6,12 +6,15 @@ import httpx
 import os
 from datetime import datetime, timedelta
 from typing import Optional, Dict, List
-from jose import jwt, JWTError
+from jose import jwk, jwt, JWTError
 
 
 class ClientService:
     """Serwis do komunikacji z crypto-server używając OAuth2"""
     
+    # Algorytmy podpisu akceptowane przy lokalnej weryfikacji tokenów
+    TOKEN_ALGORITHMS = ["RS256"]
+    
     def __init__(
         self, 
         server_url: Optional[str] = None,
@@ -29,6 +32,13 @@ class ClientService:
         self.access_token: Optional[str] = None
         self.token_expires_at: Optional[datetime] = None
         
+        # Klucze publiczne serwera (kid -> obiekt klucza), pobierane z JWKS
+        self._jwks_keys: Dict[str, object] = {}
+        
+        # Ostatnia lista kursów i jej ETag - do zapytań warunkowych (304)
+        self._rates_etag: Optional[str] = None
+        self._rates_cache: List[Dict] = []
+        
         self.http_client = httpx.AsyncClient(timeout=30.0)
     
     async def close(self):
@@ -87,25 +97,51 @@ class ClientService:
         token_data = response.json()
         self.access_token = token_data["access_token"]
         
-        # Dekoduj token aby uzyskać czas wygaśnięcia
+        # Zweryfikuj podpis lokalnie i odczytaj czas wygaśnięcia
         try:
-            # Nie weryfikujemy podpisu tutaj, bo to robimy tylko dla czytania exp
-            payload = jwt.decode(
-                self.access_token,
-                key="",  # Pusty klucz gdy verify_signature=False
-                options={"verify_signature": False}
-            )
+            payload = await self.verify_token(self.access_token)
             exp_timestamp = payload.get("exp")
             if exp_timestamp:
                 self.token_expires_at = datetime.fromtimestamp(exp_timestamp)
                 # Odejmij 1 minutę jako bufor
                 self.token_expires_at -= timedelta(minutes=1)
-        except JWTError:
-            # Jeśli nie możemy zdekodować, ustaw domyślny czas wygaśnięcia
+        except (JWTError, httpx.HTTPError):
+            # Jeśli nie możemy zweryfikować, ustaw domyślny czas wygaśnięcia
             self.token_expires_at = datetime.utcnow() + timedelta(minutes=119)
         
         return self.access_token
     
+    async def refresh_jwks(self):
+        """
+        Pobierz klucze publiczne z crypto-server
+        Endpoint: GET /.well-known/jwks.json
+        """
+        url = f"{self.server_url}/.well-known/jwks.json"
+        response = await self.http_client.get(url)
+        response.raise_for_status()
+        
+        self._jwks_keys = {
+            key_data["kid"]: jwk.construct(key_data)
+            for key_data in response.json().get("keys", [])
+        }
+    
+    async def verify_token(self, token: str) -> Dict:
+        """
+        Zweryfikuj token JWT lokalnie, bez odpytywania serwera autoryzacji
+        Klucze JWKS są pobierane tylko przy nieznanym kid (np. po rotacji)
+        """
+        header = jwt.get_unverified_header(token)
+        kid = header.get("kid")
+        
+        if kid not in self._jwks_keys:
+            await self.refresh_jwks()
+        
+        key = self._jwks_keys.get(kid)
+        if key is None:
+            raise JWTError("Nieznany klucz podpisu")
+        
+        return jwt.decode(token, key, algorithms=self.TOKEN_ALGORITHMS)
+    
     async def ensure_authenticated(self):
         """
         Upewnij się że klient jest uwierzytelniony
@@ -130,11 +166,18 @@ class ClientService:
         
         url = f"{self.server_url}/api/currency/"
         headers = self._get_auth_headers()
+        if self._rates_etag:
+            headers["If-None-Match"] = self._rates_etag
         
         response = await self.http_client.get(url, headers=headers)
+        if response.status_code == 304:
+            # Kursy nie zmieniły się od ostatniego pobrania
+            return self._rates_cache
         response.raise_for_status()
         
-        return response.json()
+        self._rates_cache = response.json()
+        self._rates_etag = response.headers.get("ETag")
+        return self._rates_cache
     
     async def get_currency_rate(self, symbol: str) -> Dict:
         """
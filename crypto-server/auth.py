@@ -1,43 +1,237 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Request
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
+from dataclasses import dataclass
 from jose import jwt
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
+import hashlib
+import math
 import os
+import secrets
+import time
 
-from .database import get_db
-from .models import ClientApp
+from .cache import TTLCache
+from .database import AsyncSessionLocal, get_db
+from .keys import ALGORITHM, key_ring
+from .models import ClientApp, RevokedToken
+from .notify import CLIENTS_CHANNEL, notify
+from .replica import REPLICA_MAX_LAG, ReadSession, get_read_db, is_replica_session
+from .revocation import revocation_list
+from .ratelimit import RATE_LIMIT_PER_MINUTE, TOKEN_FAILURE_LIMIT_PER_MINUTE, TOKEN_LIMIT_PER_MINUTE, rate_limiter
+from .usage import USAGE_CURRENCY, USAGE_TOKEN, usage_counters
+from .security import hash_secret_async, is_hashed, verify_client_secret
 
 router = APIRouter(
     prefix="/auth",
     tags=["Authentication"]
 )
 
-SECRET_KEY = "secret-key-to-sign-tokens"
-ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 120
 
 ADMIN_SECRET = os.getenv("ADMIN_SECRET", "super-secret-admin-key")
 
+CLIENT_CACHE_TTL = float(os.getenv("CLIENT_CACHE_TTL", "60"))
+CLIENT_CACHE_SIZE = int(os.getenv("CLIENT_CACHE_SIZE", "10000"))
+
+# Tożsamości klientów (odłączone obiekty ClientApp) kluczowane po "sub" z tokenu
+client_cache = TTLCache(maxsize=CLIENT_CACHE_SIZE, ttl=CLIENT_CACHE_TTL)
+# Klienci zmienieni w ostatnich REPLICA_MAX_LAG s - replika może jeszcze zwrócić stary wiersz,
+# więc load_clients czyta ich z primary
+recent_client_changes = TTLCache(maxsize=CLIENT_CACHE_SIZE, ttl=REPLICA_MAX_LAG)
+
+INTROSPECTION_CACHE_SIZE = int(os.getenv("INTROSPECTION_CACHE_SIZE", "10000"))
+INTROSPECTION_NEGATIVE_TTL = float(os.getenv("INTROSPECTION_NEGATIVE_TTL", "60"))
+INTROSPECTION_BATCH_LIMIT = 100
+
+# sha256(token) -> odpowiedź introspekcji; aktywne wpisy żyją do "exp" tokenu
+introspection_cache = TTLCache(maxsize=INTROSPECTION_CACHE_SIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+# sha256(token) -> zweryfikowany i skompilowany TokenGrant, ważny do "exp" tokenu
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+# (client_id, adres) albo (adres,) dla nieznanych client_id -> koniec blokady (monotonic) po
+# wyczerpaniu limitu nieudanych logowań; zablokowane źródło dostaje 429 bez liczenia scrypt
+login_lockouts = TTLCache(maxsize=CLIENT_CACHE_SIZE, ttl=60)
+
+SCOPE_CURRENCY_LIST = "currency:list"
+SCOPE_CURRENCY_READ = "currency:read"
+ALL_SCOPES = frozenset({SCOPE_CURRENCY_LIST, SCOPE_CURRENCY_READ})
+
+@dataclass(frozen=True)
+class TokenGrant:
+    """Uprawnienia z claimów tokenu, kompilowane raz na token."""
+    client_id: str
+    jti: Optional[str]
+    # Klucz podpisu - trafienie w token_cache sprawdza, czy nadal jest w key_ring
+    kid: Optional[str]
+    exp: int
+    scopes: FrozenSet[str]
+    # None = dostęp do wszystkich symboli
+    symbols: Optional[FrozenSet[str]]
+    # Skrót zbioru symboli - rozróżnia warianty odpowiedzi w ETag ("" = wszystkie)
+    symbols_tag: str = ""
+
+    def allows_symbol(self, symbol: str) -> bool:
+        return self.symbols is None or symbol in self.symbols
+
 class ClientCreate(BaseModel):
     client_id: str
     client_secret: str
     app_name: str
+    scopes: Optional[List[str]] = None
+    symbols: Optional[List[str]] = None
+
+class ClientUpdate(BaseModel):
+    is_active: Optional[bool] = None
+    rate_limit_per_minute: Optional[int] = None
+    token_limit_per_minute: Optional[int] = None
+    scopes: Optional[List[str]] = None
+    symbols: Optional[List[str]] = None
 
 class TokenRequest(BaseModel):
     client_id: str
     client_secret: str
 
+class RevocationRequest(BaseModel):
+    token: str
+
+class IntrospectionRequest(BaseModel):
+    token: Optional[str] = None
+    tokens: Optional[List[str]] = None
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    to_encode.update({"exp": expire, "jti": secrets.token_urlsafe(16)})
+    encoded_jwt = jwt.encode(
+        to_encode, key_ring.signing_key, algorithm=ALGORITHM, headers={"kid": key_ring.signing_kid}
+    )
     return encoded_jwt
 
+def serialize_scopes(scopes: Optional[List[str]]) -> Optional[str]:
+    if scopes is None:
+        return None
+    unknown = set(scopes) - ALL_SCOPES
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Nieznane zakresy: {', '.join(sorted(unknown))}")
+    return " ".join(sorted(set(scopes)))
+
+def normalize_symbol(symbol: str) -> str:
+    return symbol.strip().upper()
+
+def serialize_symbols(symbols: Optional[List[str]]) -> Optional[str]:
+    if symbols is None:
+        return None
+    return ",".join(sorted({normalize_symbol(symbol) for symbol in symbols if symbol.strip()}))
+
+def client_claims(client: ClientApp) -> dict:
+    claims = {
+        "sub": client.client_id,
+        "scope": client.scopes if client.scopes is not None else " ".join(sorted(ALL_SCOPES)),
+    }
+    if client.allowed_symbols is not None:
+        claims["symbols"] = client.allowed_symbols.split(",") if client.allowed_symbols else []
+    return claims
+
+def compile_grant(payload: dict, kid: Optional[str]) -> TokenGrant:
+    # Tokeny sprzed wprowadzenia zakresów nie mają claimu "scope" - pełny dostęp
+    scope = payload.get("scope")
+    symbols = payload.get("symbols")
+    return TokenGrant(
+        client_id=payload["sub"],
+        jti=payload.get("jti"),
+        kid=kid,
+        exp=payload["exp"],
+        scopes=ALL_SCOPES if scope is None else frozenset(scope.split()),
+        symbols=None if symbols is None else frozenset(symbols),
+        symbols_tag="" if symbols is None else hashlib.sha256(",".join(sorted(symbols)).encode()).hexdigest()[:12],
+    )
+
+def verify_access_token(token: str) -> Tuple[dict, Optional[str]]:
+    """Claimy zweryfikowanego tokenu i kid klucza, którym był podpisany."""
+    kid = jwt.get_unverified_header(token).get("kid")
+    key = key_ring.verification_key(kid)
+    if key is None:
+        raise JWTError("Nieznany klucz podpisu")
+    return jwt.decode(token, key, algorithms=[ALGORITHM]), kid
+
+def decode_access_token(token: str) -> dict:
+    return verify_access_token(token)[0]
+
+def invalidate_client(client_id: str):
+    client_cache.invalidate(client_id)
+    recent_client_changes.set(client_id, True)
+    # Wyniki introspekcji nie są indeksowane po kliencie, a zmiany klientów są rzadkie
+    introspection_cache.clear()
+
+async def _select_clients(client_ids: List[str], db: Union[AsyncSession, ReadSession]) -> List[ClientApp]:
+    result = await db.execute(select(ClientApp).where(ClientApp.client_id.in_(client_ids)))
+    return result.scalars().all()
+
+async def _select_clients_primary(client_ids: List[str]) -> List[ClientApp]:
+    async with AsyncSessionLocal() as primary:
+        return await _select_clients(client_ids, primary)
+
+async def load_clients(client_ids: Iterable[str], db: ReadSession) -> Dict[str, ClientApp]:
+    clients = {}
+    missing = []
+    for client_id in set(client_ids):
+        client = client_cache.get(client_id)
+        if client is None:
+            missing.append(client_id)
+        else:
+            clients[client_id] = client
+
+    if not missing:
+        return clients
+
+    # Połączenie (replika albo primary) dopiero przy chybieniu w cache
+    if not is_replica_session(await db.session()):
+        for client in await _select_clients(missing, db):
+            client_cache.set(client.client_id, client)
+            clients[client.client_id] = client
+        return clients
+
+    # Replika nie zna jeszcze klientów zarejestrowanych przed chwilą (register/bulk nie
+    # powiadamiają innych workerów) i może mieć stary wiersz klientów zmienionych w ostatnich
+    # REPLICA_MAX_LAG s - brakujące i świeżo zmienione czytamy jeszcze raz z primary
+    stale = {client_id for client_id in missing if recent_client_changes.get(client_id) is not None}
+    fresh = [client_id for client_id in missing if client_id not in stale]
+    if fresh:
+        for client in await _select_clients(fresh, db):
+            client_cache.set(client.client_id, client)
+            clients[client.client_id] = client
+
+    from_primary = [client_id for client_id in missing if client_id in stale or client_id not in clients]
+    if from_primary:
+        for client in await _select_clients_primary(from_primary):
+            client_cache.set(client.client_id, client)
+            clients[client.client_id] = client
+
+    return clients
+
+async def load_client(client_id: str, db: ReadSession) -> Optional[ClientApp]:
+    return (await load_clients([client_id], db)).get(client_id)
+
+def _too_many_requests(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Przekroczono limit zapytań",
+        headers={"Retry-After": str(math.ceil(retry_after))},
+    )
+
+async def enforce_rate_limit(scope: str, client_id: str, per_minute: Optional[int], default: int):
+    retry_after = await rate_limiter.check(scope, client_id, default if per_minute is None else per_minute)
+    if retry_after > 0:
+        raise _too_many_requests(retry_after)
+
 async def verify_admin_secret(x_admin_secret: str = Header(...)):
     if x_admin_secret != ADMIN_SECRET:
         raise HTTPException(status_code=403, detail="Nieprawidłowy klucz administratora")
@@ -50,46 +244,303 @@ async def register_client(client_data: ClientCreate, db: AsyncSession = Depends(
 
     new_client = ClientApp(
         client_id=client_data.client_id,
-        client_secret=client_data.client_secret,
-        app_name=client_data.app_name
+        client_secret=await hash_secret_async(client_data.client_secret),
+        app_name=client_data.app_name,
+        scopes=serialize_scopes(client_data.scopes),
+        allowed_symbols=serialize_symbols(client_data.symbols)
     )
     db.add(new_client)
     await db.commit()
     await db.refresh(new_client)
+    invalidate_client(new_client.client_id)
     return {"message": "Klient zarejestrowany", "id": new_client.id}
 
+@router.patch("/clients/{client_id}", dependencies=[Depends(verify_admin_secret)])
+async def update_client(client_id: str, update_data: ClientUpdate, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(ClientApp).where(ClientApp.client_id == client_id))
+    client = result.scalars().first()
+    if client is None:
+        raise HTTPException(status_code=404, detail="Klient nie znaleziony")
+
+    changes = update_data.model_dump(exclude_unset=True)
+    if changes.get("is_active", True) is None:
+        raise HTTPException(status_code=400, detail="Pole is_active nie może być puste")
+
+    if "scopes" in changes:
+        changes["scopes"] = serialize_scopes(changes["scopes"])
+    if "symbols" in changes:
+        changes["allowed_symbols"] = serialize_symbols(changes.pop("symbols"))
+
+    for field, value in changes.items():
+        setattr(client, field, value)
+    await notify(db, CLIENTS_CHANNEL, {"client_id": client_id})
+    await db.commit()
+    invalidate_client(client_id)
+    return {
+        "message": "Klient zaktualizowany",
+        "client_id": client_id,
+        "is_active": client.is_active,
+        "rate_limit_per_minute": client.rate_limit_per_minute,
+        "token_limit_per_minute": client.token_limit_per_minute,
+        "scopes": client.scopes,
+        "symbols": client.allowed_symbols,
+    }
+
+@router.delete("/clients/{client_id}", dependencies=[Depends(verify_admin_secret)])
+async def delete_client(client_id: str, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(ClientApp).where(ClientApp.client_id == client_id))
+    client = result.scalars().first()
+    if client is None:
+        raise HTTPException(status_code=404, detail="Klient nie znaleziony")
+
+    await db.delete(client)
+    await notify(db, CLIENTS_CHANNEL, {"client_id": client_id})
+    await db.commit()
+    invalidate_client(client_id)
+    return {"message": "Klient usunięty", "client_id": client_id}
+
+@router.post("/keys/rotate", dependencies=[Depends(verify_admin_secret)])
+async def rotate_signing_key():
+    kid = key_ring.rotate()
+    return {"message": "Klucz podpisu zrotowany", "kid": kid, "active_kids": [key["kid"] for key in key_ring.jwks()["keys"]]}
+
+@router.get("/cache/stats", dependencies=[Depends(verify_admin_secret)])
+async def get_cache_stats():
+    return {
+        "clients": client_cache.stats(),
+        "tokens": token_cache.stats(),
+        "introspection": introspection_cache.stats(),
+    }
+
+async def _login_failed(scope: str, source: tuple) -> HTTPException:
+    """Nieudane logowanie zużywa limit źródła, a nie limit wydawania tokenów klienta."""
+    retry_after = await rate_limiter.check(scope, ":".join(source), TOKEN_FAILURE_LIMIT_PER_MINUTE)
+    if retry_after > 0:
+        login_lockouts.set(source, time.monotonic() + retry_after, ttl=retry_after)
+        return _too_many_requests(retry_after)
+    return HTTPException(status_code=401, detail="Nieprawidłowe dane")
+
 @router.post("/token")
-async def login_for_access_token(token_data: TokenRequest, db: AsyncSession = Depends(get_db)):
+async def login_for_access_token(token_data: TokenRequest, request: Request, db: AsyncSession = Depends(get_db)):
+    host = request.client.host if request.client else ""
+    source = (token_data.client_id, host)
+    locked_until = login_lockouts.get(source)
+    if locked_until is not None:
+        raise _too_many_requests(locked_until - time.monotonic())
+
     result = await db.execute(select(ClientApp).where(ClientApp.client_id == token_data.client_id))
     client = result.scalars().first()
 
-    if not client or client.client_secret != token_data.client_secret:
-        raise HTTPException(status_code=401, detail="Nieprawidłowe dane")
+    if client is None:
+        # client_id wybiera wołający - nieznane liczymy na sam adres, a nie kubełek na każdy wymyślony identyfikator
+        locked_until = login_lockouts.get((host,))
+        if locked_until is not None:
+            raise _too_many_requests(locked_until - time.monotonic())
+        raise await _login_failed("token_unknown_client", (host,))
+
+    # Dezaktywowany klient nie dostaje tokenu - odrzucamy go przed kosztowną weryfikacją scrypt
+    if not client.is_active:
+        raise await _login_failed("token_failure", source)
+
+    if not await verify_client_secret(client.client_id, token_data.client_secret, client.client_secret):
+        raise await _login_failed("token_failure", source)
+
+    # Limit wydawania tylko po poprawnym sekrecie - obcy znający client_id nie zablokuje klienta
+    await enforce_rate_limit("token", client.client_id, client.token_limit_per_minute, TOKEN_LIMIT_PER_MINUTE)
+
+    if not is_hashed(client.client_secret):
+        client.client_secret = await hash_secret_async(token_data.client_secret)
+        await notify(db, CLIENTS_CHANNEL, {"client_id": client.client_id})
+        await db.commit()
+        invalidate_client(client.client_id)
 
-    access_token = create_access_token(data={"sub": client.client_id})
+    access_token = create_access_token(data=client_claims(client))
+    usage_counters.increment(client.client_id, USAGE_TOKEN)
     return {"access_token": access_token, "token_type": "bearer"}
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
 
-async def get_current_client(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
-    credentials_exception = HTTPException(
+def _token_cache_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=401,
         detail="Token jest nieważny lub wygasł",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+def resolve_token_grant(token: str) -> TokenGrant:
+    key = _token_cache_key(token)
+    grant = token_cache.get(key)
+    if grant is None:
+        try:
+            payload, kid = verify_access_token(token)
+        except JWTError:
+            raise _credentials_exception()
+        if payload.get("sub") is None:
+            raise _credentials_exception()
+
+        grant = compile_grant(payload, kid)
+        token_cache.set(key, grant, ttl=grant.exp - time.time())
+    elif key_ring.verification_key(grant.kid) is None:
+        # Klucz wypadł z okna weryfikacji po rotacji - podpis już się nie weryfikuje
+        token_cache.invalidate(key)
+        raise _credentials_exception()
+
+    if revocation_list.is_revoked(grant.jti):
+        raise _credentials_exception()
+
+    return grant
+
+async def get_token_grant(token: str = Depends(oauth2_scheme)) -> TokenGrant:
+    return resolve_token_grant(token)
+
+async def authenticate_stream(token: str, db: ReadSession) -> TokenGrant:
+    """Uwierzytelnienie połączenia strumieniowego - te same reguły co get_token_grant i get_rate_limited_client."""
+    grant = resolve_token_grant(token)
+    client = await load_client(grant.client_id, db)
+    if client is None or not client.is_active:
+        raise _credentials_exception()
+
+    await enforce_rate_limit("currency", client.client_id, client.rate_limit_per_minute, RATE_LIMIT_PER_MINUTE)
+    usage_counters.increment(client.client_id, USAGE_CURRENCY)
+    return grant
+
+async def get_current_client(grant: TokenGrant = Depends(get_token_grant), db: ReadSession = Depends(get_read_db)):
+    client = await load_client(grant.client_id, db)
+    if client is None or not client.is_active:
+        raise _credentials_exception()
+
+    return client
+
+async def get_rate_limited_client(current_client: ClientApp = Depends(get_current_client)):
+    await enforce_rate_limit(
+        "currency", current_client.client_id, current_client.rate_limit_per_minute, RATE_LIMIT_PER_MINUTE
+    )
+    usage_counters.increment(current_client.client_id, USAGE_CURRENCY)
+    return current_client
+
+async def get_rate_limited_grant(
+    grant: TokenGrant = Depends(get_token_grant),
+    current_client: ClientApp = Depends(get_rate_limited_client)
+) -> TokenGrant:
+    return grant
+
+def ensure_scope(grant: TokenGrant, scope: str):
+    if scope not in grant.scopes:
+        raise HTTPException(status_code=403, detail=f"Token nie ma zakresu {scope}")
+
+def require_scope(scope: str):
+    async def check_scope(grant: TokenGrant = Depends(get_rate_limited_grant)) -> TokenGrant:
+        ensure_scope(grant, scope)
+        return grant
+
+    return check_scope
+
+def _introspection_result(payload: dict) -> dict:
+    return {
+        "active": True,
+        "sub": payload["sub"],
+        "client_id": payload["sub"],
+        "token_type": "Bearer",
+        "exp": payload["exp"],
+        "jti": payload.get("jti"),
+        "scope": payload.get("scope", " ".join(sorted(ALL_SCOPES))),
+    }
+
+async def introspect_tokens(tokens: List[str], db: ReadSession) -> List[dict]:
+    """Introspekcja (RFC 7662) wielu tokenów: jedna weryfikacja na token i jedno zapytanie o klientów."""
+    results: List[Optional[dict]] = [None] * len(tokens)
+    pending = []
+
+    for index, token in enumerate(tokens):
+        # Wpisy to (odpowiedź, kid) - aktywny token przestaje nim być po unieważnieniu albo wycofaniu klucza
+        cached = introspection_cache.get(_token_cache_key(token))
+        if cached is not None:
+            result, kid = cached
+            inactive = result["active"] and (
+                revocation_list.is_revoked(result.get("jti")) or key_ring.verification_key(kid) is None
+            )
+            results[index] = {"active": False} if inactive else result
+            continue
+
+        try:
+            payload, kid = verify_access_token(token)
+        except JWTError:
+            payload = None
+
+        if payload is None or payload.get("sub") is None or revocation_list.is_revoked(payload.get("jti")):
+            results[index] = {"active": False}
+            introspection_cache.set(_token_cache_key(token), (results[index], None), ttl=INTROSPECTION_NEGATIVE_TTL)
+        else:
+            pending.append((index, token, payload, kid))
+
+    if pending:
+        clients = await load_clients((payload["sub"] for _, _, payload, _ in pending), db)
+        for index, token, payload, kid in pending:
+            client = clients.get(payload["sub"])
+            if client is not None and client.is_active:
+                result = _introspection_result(payload)
+                ttl = payload["exp"] - time.time()
+            else:
+                result = {"active": False}
+                ttl = INTROSPECTION_NEGATIVE_TTL
+
+            results[index] = result
+            if ttl > 0:
+                introspection_cache.set(_token_cache_key(token), (result, kid), ttl=ttl)
+
+    return results
+
+@router.post("/introspect")
+async def introspect(
+    request: IntrospectionRequest,
+    db: ReadSession = Depends(get_read_db),
+    current_client: ClientApp = Depends(get_current_client)
+):
+    if (request.token is None) == (request.tokens is None):
+        raise HTTPException(status_code=400, detail="Podaj dokładnie jedno z pól: token lub tokens")
+
+    if request.token is not None:
+        return (await introspect_tokens([request.token], db))[0]
+
+    if len(request.tokens) > INTROSPECTION_BATCH_LIMIT:
+        raise HTTPException(status_code=400, detail=f"Maksymalnie {INTROSPECTION_BATCH_LIMIT} tokenów w jednym żądaniu")
+
+    return {"results": await introspect_tokens(request.tokens, db)}
+
+
+@router.post("/revoke")
+async def revoke_token(
+    request: RevocationRequest,
+    db: AsyncSession = Depends(get_db),
+    current_client: ClientApp = Depends(get_current_client)
+):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        client_id: str = payload.get("sub")
-        if client_id is None:
-            raise credentials_exception
+        payload = decode_access_token(request.token)
     except JWTError:
-        raise credentials_exception
+        # RFC 7009: nieważny token nie jest błędem
+        return {"message": "Token unieważniony"}
 
-    result = await db.execute(select(ClientApp).where(ClientApp.client_id == client_id))
-    client = result.scalars().first()
+    if payload.get("sub") != current_client.client_id:
+        raise HTTPException(status_code=403, detail="Można unieważniać tylko własne tokeny")
 
-    if client is None:
-        raise credentials_exception
+    jti = payload.get("jti")
+    if jti is None:
+        raise HTTPException(status_code=400, detail="Token nie posiada identyfikatora jti")
 
-    return client
+    if not revocation_list.is_revoked(jti):
+        await db.execute(
+            insert(RevokedToken)
+            .values(
+                jti=jti,
+                client_id=current_client.client_id,
+                expires_at=datetime.fromtimestamp(payload["exp"], tz=timezone.utc),
+            )
+            .on_conflict_do_nothing(index_elements=["jti"])
+        )
+        await db.commit()
+        revocation_list.add(jti, payload["exp"])
+
+    return {"message": "Token unieważniony"}
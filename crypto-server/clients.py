@@ -0,0 +1,282 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import func
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, ValidationError, field_validator
+from typing import List, Optional, Union
+from datetime import datetime, timedelta, timezone
+import csv
+import io
+import json
+import re
+
+from .auth import invalidate_client, serialize_scopes, serialize_symbols, verify_admin_secret
+from .database import get_db
+from .models import ClientApp, ClientUsage
+from .security import hash_secrets_async, parse_hash
+
+router = APIRouter(
+    prefix="/auth",
+    tags=["Client Management"],
+    dependencies=[Depends(verify_admin_secret)]
+)
+
+CLIENTS_PAGE_SIZE = 100
+CLIENTS_PAGE_LIMIT = 1000
+
+USAGE_ROWS_LIMIT = 10000
+
+BULK_REGISTER_LIMIT = 50000
+# 6 parametrów na wiersz - jeden INSERT mieści się w limicie 32767 parametrów asyncpg
+BULK_INSERT_CHUNK = 5000
+
+
+class BulkClientRow(BaseModel):
+    client_id: str
+    client_secret: Optional[str] = None
+    # Import z innego systemu: gotowy hash w formacie security.hash_secret
+    client_secret_hash: Optional[str] = None
+    app_name: Optional[str] = None
+    scopes: Optional[Union[List[str], str]] = None
+    symbols: Optional[Union[List[str], str]] = None
+
+    @field_validator("client_id")
+    @classmethod
+    def client_id_not_empty(cls, value: str) -> str:
+        value = value.strip()
+        if not value:
+            raise ValueError("client_id nie może być pusty")
+        return value
+
+    @field_validator("scopes", "symbols")
+    @classmethod
+    def split_list(cls, value):
+        if isinstance(value, str):
+            return [item for item in re.split(r"[\s,;]+", value) if item]
+        return value
+
+
+def _parse_rows(content_type: str, body: bytes) -> List[dict]:
+    if "csv" in content_type:
+        reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+        # Puste komórki CSV traktujemy jak brak wartości
+        return [{key: value for key, value in row.items() if key and value not in (None, "")} for row in reader]
+
+    data = json.loads(body)
+    if isinstance(data, dict):
+        data = data.get("clients")
+    if not isinstance(data, list):
+        raise ValueError("Oczekiwano listy klientów lub obiektu {\"clients\": [...]}")
+    return data
+
+
+@router.post("/register/bulk")
+async def register_clients_bulk(request: Request, db: AsyncSession = Depends(get_db)):
+    try:
+        raw_rows = _parse_rows(request.headers.get("content-type", ""), await request.body())
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Nieprawidłowe dane wejściowe: {e}")
+
+    if len(raw_rows) > BULK_REGISTER_LIMIT:
+        raise HTTPException(status_code=400, detail=f"Maksymalnie {BULK_REGISTER_LIMIT} klientów w jednym żądaniu")
+
+    errors = []
+    conflicts = []
+    rows = {}
+    for index, raw in enumerate(raw_rows):
+        try:
+            row = BulkClientRow.model_validate(raw)
+            if (row.client_secret is None) == (row.client_secret_hash is None):
+                raise ValueError("Podaj dokładnie jedno z pól: client_secret lub client_secret_hash")
+            if row.client_secret_hash is not None:
+                try:
+                    parse_hash(row.client_secret_hash)
+                except ValueError as e:
+                    raise ValueError(f"Nieprawidłowy client_secret_hash: {e}")
+            scopes = serialize_scopes(row.scopes)
+            symbols = serialize_symbols(row.symbols)
+        except ValidationError as e:
+            errors.append({"row": index, "error": e.errors(include_url=False)[0]["msg"]})
+            continue
+        except (ValueError, TypeError) as e:
+            errors.append({"row": index, "error": str(e)})
+            continue
+        except HTTPException as e:
+            errors.append({"row": index, "error": e.detail})
+            continue
+
+        if row.client_id in rows:
+            conflicts.append({"row": index, "client_id": row.client_id, "reason": "Powtórzony w żądaniu"})
+            continue
+        rows[row.client_id] = (index, row, scopes, symbols)
+
+    # Istniejących klientów odrzucamy przed kosztownym hashowaniem sekretów
+    existing = set()
+    client_ids = list(rows)
+    for start in range(0, len(client_ids), BULK_INSERT_CHUNK):
+        result = await db.execute(
+            select(ClientApp.client_id).where(ClientApp.client_id.in_(client_ids[start:start + BULK_INSERT_CHUNK]))
+        )
+        existing.update(result.scalars().all())
+
+    # Koniec transakcji odczytu - połączenie wraca do puli na czas hashowania (minuty przy 10k sekretów),
+    # zamiast wisieć jako "idle in transaction"
+    await db.rollback()
+
+    for client_id in existing:
+        index, _, _, _ = rows.pop(client_id)
+        conflicts.append({"row": index, "client_id": client_id, "reason": "Taki Client ID już istnieje"})
+
+    pending = list(rows.values())
+    plain = [row.client_secret for _, row, _, _ in pending if row.client_secret_hash is None]
+    hashed = iter(await hash_secrets_async(plain))
+    hashes = [row.client_secret_hash or next(hashed) for _, row, _, _ in pending]
+
+    values = [
+        {
+            "client_id": row.client_id,
+            "client_secret": secret_hash,
+            "app_name": row.app_name,
+            "is_active": True,
+            "scopes": scopes,
+            "allowed_symbols": symbols,
+        }
+        for (_, row, scopes, symbols), secret_hash in zip(pending, hashes)
+    ]
+
+    inserted = set()
+    for start in range(0, len(values), BULK_INSERT_CHUNK):
+        result = await db.execute(
+            insert(ClientApp)
+            .values(values[start:start + BULK_INSERT_CHUNK])
+            .on_conflict_do_nothing(index_elements=["client_id"])
+            .returning(ClientApp.client_id)
+        )
+        inserted.update(result.scalars().all())
+    await db.commit()
+
+    # Wiersze wstawione równolegle przez inne żądanie
+    for index, row, _, _ in pending:
+        if row.client_id not in inserted:
+            conflicts.append({"row": index, "client_id": row.client_id, "reason": "Taki Client ID już istnieje"})
+
+    for client_id in inserted:
+        invalidate_client(client_id)
+
+    conflicts.sort(key=lambda conflict: conflict["row"])
+    return {
+        "message": "Import zakończony",
+        "received": len(raw_rows),
+        "inserted": len(inserted),
+        "conflicts": conflicts,
+        "errors": errors,
+    }
+
+
+def map_client_to_response(client: ClientApp) -> dict:
+    return {
+        "id": client.id,
+        "client_id": client.client_id,
+        "app_name": client.app_name,
+        "is_active": client.is_active,
+        "created_at": client.created_at,
+        "scopes": client.scopes,
+        "symbols": client.allowed_symbols,
+        "rate_limit_per_minute": client.rate_limit_per_minute,
+        "token_limit_per_minute": client.token_limit_per_minute,
+    }
+
+
+@router.get("/clients")
+async def list_clients(
+    cursor: Optional[int] = Query(None, description="Wartość next_cursor z poprzedniej strony"),
+    limit: int = Query(CLIENTS_PAGE_SIZE, ge=1, le=CLIENTS_PAGE_LIMIT),
+    is_active: Optional[bool] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    include_usage: bool = Query(False, description="Dołącz liczbę wywołań z ostatnich 24h"),
+    db: AsyncSession = Depends(get_db)
+):
+    # Keyset zamiast OFFSET: koszt strony nie zależy od tego, jak daleko jest kursor
+    query = select(ClientApp).order_by(ClientApp.id).limit(limit + 1)
+    if cursor is not None:
+        query = query.where(ClientApp.id > cursor)
+    if is_active is not None:
+        query = query.where(ClientApp.is_active == is_active)
+    if created_from is not None:
+        query = query.where(ClientApp.created_at >= created_from)
+    if created_to is not None:
+        query = query.where(ClientApp.created_at < created_to)
+
+    result = await db.execute(query)
+    clients = result.scalars().all()
+
+    has_more = len(clients) > limit
+    clients = clients[:limit]
+    items = [map_client_to_response(client) for client in clients]
+
+    if include_usage and clients:
+        usage = await _usage_last_24h([client.client_id for client in clients], db)
+        for item in items:
+            item["usage_24h"] = usage.get(item["client_id"], {})
+
+    return {
+        "items": items,
+        "count": len(clients),
+        "next_cursor": clients[-1].id if has_more else None,
+    }
+
+
+async def _usage_last_24h(client_ids: List[str], db: AsyncSession) -> dict:
+    result = await db.execute(
+        select(ClientUsage.client_id, ClientUsage.kind, func.sum(ClientUsage.count))
+        .where(ClientUsage.client_id.in_(client_ids))
+        .where(ClientUsage.bucket >= datetime.now(timezone.utc) - timedelta(hours=24))
+        .group_by(ClientUsage.client_id, ClientUsage.kind)
+    )
+    usage = {}
+    for client_id, kind, count in result.all():
+        usage.setdefault(client_id, {})[kind] = count
+    return usage
+
+
+@router.get("/usage")
+async def get_usage(
+    client_id: Optional[str] = None,
+    kind: Optional[str] = None,
+    since: Optional[datetime] = Query(None, description="Domyślnie ostatnie 24h"),
+    until: Optional[datetime] = None,
+    granularity: str = Query("hour", pattern="^(minute|hour|day)$"),
+    db: AsyncSession = Depends(get_db)
+):
+    # Dane z ostatnich sekund mogą jeszcze czekać w pamięci na flush (usage.USAGE_FLUSH_INTERVAL)
+    if since is None:
+        since = datetime.now(timezone.utc) - timedelta(hours=24)
+
+    bucket = func.date_trunc(granularity, ClientUsage.bucket).label("bucket")
+    total = func.sum(ClientUsage.count).label("count")
+    query = (
+        select(ClientUsage.client_id, ClientUsage.kind, bucket, total)
+        .where(ClientUsage.bucket >= since)
+        .group_by(ClientUsage.client_id, ClientUsage.kind, bucket)
+        .order_by(bucket, ClientUsage.client_id, ClientUsage.kind)
+        .limit(USAGE_ROWS_LIMIT)
+    )
+    if until is not None:
+        query = query.where(ClientUsage.bucket < until)
+    if client_id is not None:
+        query = query.where(ClientUsage.client_id == client_id)
+    if kind is not None:
+        query = query.where(ClientUsage.kind == kind)
+
+    result = await db.execute(query)
+    return {
+        "granularity": granularity,
+        "since": since,
+        "until": until,
+        "items": [
+            {"client_id": row.client_id, "kind": row.kind, "bucket": row.bucket, "count": row.count}
+            for row in result.all()
+        ],
+    }
@@ -0,0 +1,49 @@
+import gzip
+import os
+from typing import Optional
+
+import brotli
+
+# Mniejsze odpowiedzi (np. pojedynczy kurs) idą bez kompresji - narzut nagłówków i CPU się nie zwraca
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+# Treść jest kompresowana raz na tick w wątku, ale pierwsze żądanie po ticku czeka na wynik -
+# poziomy szybkie zamiast maksymalnych
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Kolejność preferencji przy równych wagach q
+SUPPORTED_ENCODINGS = ("br", "gzip")
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Wybiera kodowanie z nagłówka Accept-Encoding (z uwzględnieniem wag q); None = bez kompresji."""
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+
+        weight = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding] = weight
+
+    best, best_weight = None, 0.0
+    for coding in SUPPORTED_ENCODINGS:
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0 - te same bajty na każdym workerze dla tej samej wersji
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
@@ -1,14 +1,27 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from sqlalchemy import any_
 from sqlalchemy.future import select
-from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import Callable, List, Mapping, Optional, Sequence, Union
+from email.utils import parsedate_to_datetime
 from pydantic import BaseModel, Field
 from datetime import datetime
+import asyncio
+import hashlib
+import json
+import orjson
 import random
+import time
 
-from .database import get_db
-from .models import CurrencyRate, ClientApp
-from .auth import get_current_client
+from .models import CurrencyRate
+from .compression import COMPRESSION_MIN_SIZE, SUPPORTED_ENCODINGS, compress, negotiate_encoding
+from .replica import ReadSession, get_read_db
+from .snapshot import RateSnapshot, rate_snapshot
+from .streaming import RESYNC, encode_frame, rate_hub
+from .revocation import revocation_list
+from .auth import (
+    SCOPE_CURRENCY_LIST, SCOPE_CURRENCY_READ, TokenGrant, authenticate_stream, ensure_scope,
+    get_rate_limited_grant, normalize_symbol, require_scope
+)
 
 router = APIRouter(
     prefix="/currency",
@@ -31,6 +44,11 @@ CURRENCY_NAMES = {
     "AVAX": "Avalanche"
 }
 
+SYMBOLS_QUERY_LIMIT = 100
+
+# Maksymalna liczba skompresowanych wariantów odpowiedzi trzymanych w jednym snapshocie
+COMPRESSION_CACHE_SIZE = 256
+
 class CurrencyResponse(BaseModel):
     symbol: str
     rate: float
@@ -41,6 +59,12 @@ class CurrencyResponse(BaseModel):
     class Config:
         orm_mode = True
 
+class BatchRatesResponse(BaseModel):
+    """Odpowiedź /currency/?symbols= - kursy w kolejności zapytania i symbole, których nie zwrócono."""
+    rates: List[CurrencyResponse]
+    unknown: List[str]
+    forbidden: List[str]
+
 def map_currency_to_response(currency: CurrencyRate) -> CurrencyResponse:
     return CurrencyResponse(
         symbol=currency.symbol,
@@ -50,27 +74,307 @@ def map_currency_to_response(currency: CurrencyRate) -> CurrencyResponse:
         updated_at=currency.last_updated or datetime.utcnow()
     )
 
-@router.get("/", response_model=List[CurrencyResponse])
+def encode_rate(symbol: str, rate: float, change_24h: Optional[float], updated_at: datetime) -> bytes:
+    """JSON jednego wiersza o schemacie CurrencyResponse, bez budowania modelu Pydantic.
+
+    OPT_UTC_Z daje ten sam zapis strefy ("Z") co Pydantic.
+    """
+    return orjson.dumps(
+        {
+            "symbol": symbol,
+            "rate": rate,
+            "name": CURRENCY_NAMES.get(symbol, symbol),
+            "change_24h": change_24h if change_24h is not None else 0.0,
+            "updated_at": updated_at,
+        },
+        option=orjson.OPT_UTC_Z,
+    )
+
+def encode_currency(currency: CurrencyRate) -> bytes:
+    return encode_rate(currency.symbol, currency.rate, currency.change_24h, currency.last_updated or datetime.utcnow())
+
+def publish_rates(
+    symbols: Sequence[str], rates: Sequence[float], changes_24h: Sequence[float], version: int, last_updated: datetime,
+    partial: bool = False
+) -> RateSnapshot:
+    """Publikuje stan kursów po ticku generatora jako niezmienny snapshot i rozsyła zmiany subskrybentom.
+
+    partial=True: przekazane są tylko zmienione waluty, pozostałe wiersze przechodzą z poprzedniego snapshotu.
+    """
+    previous = rate_snapshot.current
+    rows = {
+        symbol: encode_rate(symbol, rate, change_24h, last_updated)
+        for symbol, rate, change_24h in zip(symbols, rates, changes_24h)
+    }
+    if partial and previous is not None:
+        rows = {**previous.rows, **rows}
+
+    snapshot = rate_snapshot.publish(version, last_updated, rows.items())
+    rate_hub.broadcast(previous, snapshot)
+    return snapshot
+
+def _encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    # Silny ETag musi się różnić między reprezentacjami (RFC 9110) - kodowanie jest częścią znacznika
+    return etag if encoding is None else f'{etag[:-1]}-{encoding}"'
+
+def _not_modified(request: Request, etag: str, snapshot: RateSnapshot) -> Optional[str]:
+    """ETag odpowiedzi 304 albo None, gdy trzeba wysłać treść."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match ma pierwszeństwo przed If-Modified-Since (RFC 7232). Pasuje wariant
+        # w dowolnym kodowaniu - 304 potwierdza znacznik, który klient już ma
+        variants = {etag, *(_encoded_etag(etag, encoding) for encoding in SUPPORTED_ENCODINGS)}
+        for tag in if_none_match.split(","):
+            tag = tag.strip().removeprefix("W/")
+            if tag in variants:
+                return tag
+            if tag == "*":
+                return etag
+        return None
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+            return etag if snapshot.last_updated.replace(microsecond=0) <= since else None
+        except (TypeError, ValueError):
+            return None
+
+    return None
+
+async def snapshot_response(request: Request, snapshot: RateSnapshot, etag: str, body: Callable[[], bytes]) -> Response:
+    """Odpowiedź ze snapshotu; przy trafionym warunku 304 bez budowania treści.
+
+    Skompresowana treść jest liczona raz na (wariant, kodowanie) w wątku i trzymana w snapshocie do następnego ticku.
+    """
+    headers = {"Last-Modified": snapshot.last_modified, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    matched = _not_modified(request, etag, snapshot)
+    if matched is not None:
+        headers["ETag"] = matched
+        return Response(status_code=304, headers=headers)
+
+    content = body()
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    if encoding is not None and len(content) >= COMPRESSION_MIN_SIZE:
+        key = (etag, encoding)
+        compressed = snapshot.compressed.get(key)
+        if compressed is None:
+            # Kompresja pełnej listy to dziesiątki ms - poza pętlą zdarzeń. Zadanie trafia do cache
+            # od razu, więc równoległe żądania o ten sam wariant czekają na jedną kompresję
+            compressed = asyncio.ensure_future(asyncio.to_thread(compress, content, encoding))
+            # Warianty z ?symbols= są praktycznie nieograniczone - cache tylko do limitu na snapshot
+            if len(snapshot.compressed) < COMPRESSION_CACHE_SIZE:
+                snapshot.compressed[key] = compressed
+        # shield - rozłączony klient nie anuluje kompresji współdzielonej z innymi żądaniami
+        content = await asyncio.shield(compressed)
+        headers["Content-Encoding"] = encoding
+        etag = _encoded_etag(etag, encoding)
+
+    headers["ETag"] = etag
+    return Response(content=content, media_type="application/json", headers=headers)
+
+def _parse_symbols(symbols: str) -> List[str]:
+    # Kolejność z żądania, bez powtórzeń
+    requested = list(dict.fromkeys(normalize_symbol(symbol) for symbol in symbols.split(",") if symbol.strip()))
+    if not requested:
+        raise HTTPException(status_code=400, detail="Podaj co najmniej jeden symbol")
+    if len(requested) > SYMBOLS_QUERY_LIMIT:
+        raise HTTPException(status_code=400, detail=f"Maksymalnie {SYMBOLS_QUERY_LIMIT} symboli w jednym żądaniu")
+    return requested
+
+def _batch_body(rows: Mapping[str, bytes], requested: List[str], grant: TokenGrant) -> bytes:
+    found = [symbol for symbol in requested if symbol in rows and grant.allows_symbol(symbol)]
+    unknown = [symbol for symbol in requested if symbol not in rows]
+    forbidden = [symbol for symbol in requested if symbol in rows and not grant.allows_symbol(symbol)]
+    return (
+        b'{"rates":[' + b",".join(rows[symbol] for symbol in found) + b"]," +
+        f'"unknown":{json.dumps(unknown)},"forbidden":{json.dumps(forbidden)}}}'.encode()
+    )
+
+@router.get(
+    "/",
+    response_model=Union[List[CurrencyResponse], BatchRatesResponse],
+    description="Bez parametru symbols: lista wszystkich kursów. Z symbols: obiekt {rates, unknown, forbidden}.",
+)
 async def get_all_rates(
-    db: AsyncSession = Depends(get_db),
-    current_client: ClientApp = Depends(get_current_client)
+    request: Request,
+    symbols: Optional[str] = Query(
+        None, description="Lista symboli po przecinku, np. BTC,ETH,SOL - odpowiedź {rates, unknown, forbidden}"
+    ),
+    db: ReadSession = Depends(get_read_db),
+    grant: TokenGrant = Depends(get_rate_limited_grant)
 ):
+    # Wybrane symbole zastępują N wywołań /{symbol} - wymagają tego samego zakresu co one
+    ensure_scope(grant, SCOPE_CURRENCY_LIST if symbols is None else SCOPE_CURRENCY_READ)
+    requested = _parse_symbols(symbols) if symbols is not None else None
+    snapshot = rate_snapshot.current
+
+    if requested is not None:
+        if snapshot is not None:
+            # Wynik zależy od listy symboli i uprawnień tokenu - oba wchodzą do ETag
+            variant = hashlib.sha256(",".join(requested).encode()).hexdigest()[:12]
+            return await snapshot_response(
+                request, snapshot, f'"{snapshot.version}-{grant.symbols_tag}-{variant}"',
+                lambda: _batch_body(snapshot.rows, requested, grant),
+            )
+
+        result = await db.execute(select(CurrencyRate).where(CurrencyRate.symbol == any_(requested)))
+        rows = {rate.symbol: encode_currency(rate) for rate in result.scalars().all()}
+        return Response(content=_batch_body(rows, requested, grant), media_type="application/json")
+
+    if snapshot is not None:
+        if grant.symbols is None:
+            return await snapshot_response(request, snapshot, snapshot.etag, lambda: snapshot.body)
+
+        return await snapshot_response(
+            request, snapshot, f'"{snapshot.version}-{grant.symbols_tag}"',
+            lambda: snapshot.select(symbol for symbol in snapshot.rows if grant.allows_symbol(symbol)),
+        )
+
+    # Przed pierwszym tickiem generatora
     result = await db.execute(select(CurrencyRate))
     rates = result.scalars().all()
 
-    return [map_currency_to_response(rate) for rate in rates]
+    return Response(
+        content=b"[" + b",".join(encode_currency(rate) for rate in rates if grant.allows_symbol(rate.symbol)) + b"]",
+        media_type="application/json",
+    )
 
 @router.get("/{symbol}", response_model=CurrencyResponse)
 async def get_single_rate(
     symbol: str,
-    db: AsyncSession = Depends(get_db),
-    current_client: ClientApp = Depends(get_current_client)
+    request: Request,
+    db: ReadSession = Depends(get_read_db),
+    grant: TokenGrant = Depends(require_scope(SCOPE_CURRENCY_READ))
 ):
-    result = await db.execute(select(CurrencyRate).where(CurrencyRate.symbol == symbol.upper()))
+    symbol = normalize_symbol(symbol)
+    if not grant.allows_symbol(symbol):
+        raise HTTPException(status_code=403, detail="Brak dostępu do tej waluty")
+
+    snapshot = rate_snapshot.current
+    if snapshot is not None:
+        row = snapshot.rows.get(symbol)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Waluta nie znaleziona")
+        return await snapshot_response(request, snapshot, f'"{snapshot.version}-{symbol}"', lambda: row)
+
+    result = await db.execute(select(CurrencyRate).where(CurrencyRate.symbol == symbol))
     rate = result.scalars().first()
 
     if not rate:
-        from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Waluta nie znaleziona")
 
-    return map_currency_to_response(rate)
+    return Response(content=encode_currency(rate), media_type="application/json")
+
+# Kody zamknięcia WebSocket (RFC 6455)
+WS_CLOSE_POLICY_VIOLATION = 1008
+WS_CLOSE_TRY_AGAIN_LATER = 1013
+
+def _stream_token(websocket: WebSocket, token: Optional[str]) -> Optional[str]:
+    # Przeglądarki nie ustawiają nagłówków przy WebSocket - stąd alternatywny parametr ?token=
+    scheme, _, value = websocket.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and value.strip():
+        return value.strip()
+    return token
+
+def _parse_subscription(message: str) -> tuple:
+    try:
+        data = json.loads(message)
+    except ValueError:
+        raise ValueError("Nieprawidłowy JSON")
+
+    if not isinstance(data, dict) or data.get("action") not in ("subscribe", "unsubscribe"):
+        raise ValueError("Oczekiwano {\"action\": \"subscribe\" | \"unsubscribe\", \"symbols\": [...]}")
+
+    symbols = data.get("symbols")
+    if symbols == "*":
+        return data["action"], None
+    if not isinstance(symbols, list) or not all(isinstance(symbol, str) for symbol in symbols):
+        raise ValueError("Pole symbols musi być listą symboli lub \"*\"")
+    return data["action"], {normalize_symbol(symbol) for symbol in symbols if symbol.strip()}
+
+@router.websocket("/ws")
+async def stream_rates(websocket: WebSocket, token: Optional[str] = None):
+    """Strumień zmian kursów dla subskrybowanych symboli.
+
+    Klient wysyła {"action": "subscribe" | "unsubscribe", "symbols": [...] | "*"},
+    dostaje potwierdzenie i ramkę "snapshot" z bieżącymi kursami, a po każdym
+    ticku generatora ramkę "delta" tylko ze zmienionymi wierszami.
+    """
+    token = _stream_token(websocket, token)
+    if not token:
+        await websocket.close(code=WS_CLOSE_POLICY_VIOLATION, reason="Brak tokenu")
+        return
+
+    try:
+        # Sesja tylko na czas uwierzytelnienia - połączenie z bazą nie jest trzymane przez cały strumień
+        async with ReadSession() as db:
+            grant = await authenticate_stream(token, db)
+    except HTTPException as e:
+        code = WS_CLOSE_TRY_AGAIN_LATER if e.status_code == 429 else WS_CLOSE_POLICY_VIOLATION
+        await websocket.close(code=code, reason=e.detail)
+        return
+
+    if SCOPE_CURRENCY_READ not in grant.scopes:
+        await websocket.close(code=WS_CLOSE_POLICY_VIOLATION, reason=f"Token nie ma zakresu {SCOPE_CURRENCY_READ}")
+        return
+
+    await websocket.accept()
+    subscription = rate_hub.register()
+    send_lock = asyncio.Lock()
+
+    async def send(frame: str):
+        async with send_lock:
+            await websocket.send_text(frame)
+
+    async def sender():
+        while True:
+            frame = await subscription.queue.get()
+            if grant.exp <= time.time() or revocation_list.is_revoked(grant.jti):
+                await websocket.close(code=WS_CLOSE_POLICY_VIOLATION, reason="Token jest nieważny lub wygasł")
+                return
+
+            if frame is RESYNC:
+                snapshot = rate_snapshot.current
+                frame = encode_frame(
+                    "snapshot", snapshot, [symbol for symbol in snapshot.rows if symbol in subscription.symbols]
+                )
+            await send(frame)
+
+    sender_task = asyncio.create_task(sender())
+    try:
+        while True:
+            try:
+                action, symbols = _parse_subscription(await websocket.receive_text())
+            except ValueError as e:
+                await send(json.dumps({"type": "error", "detail": str(e)}))
+                continue
+
+            snapshot = rate_snapshot.current
+            known = list(snapshot.rows) if snapshot is not None else list(CURRENCY_NAMES)
+            requested = set(known) if symbols is None else symbols
+            unknown = sorted(requested.difference(known))
+            forbidden = sorted(symbol for symbol in requested.intersection(known) if not grant.allows_symbol(symbol))
+
+            if action == "subscribe":
+                added = {symbol for symbol in requested.intersection(known) if grant.allows_symbol(symbol)}
+                added -= subscription.symbols
+                subscription.symbols = subscription.symbols | added
+            else:
+                added = set()
+                subscription.symbols = subscription.symbols - requested
+
+            await send(json.dumps({
+                "type": f"{action}d",
+                "symbols": [symbol for symbol in known if symbol in subscription.symbols],
+                "unknown": unknown,
+                # "*" to skrót "wszystko, do czego mam dostęp" - nie raportujemy wtedy braków uprawnień
+                "forbidden": forbidden if symbols is not None else [],
+            }))
+            if added and snapshot is not None:
+                await send(encode_frame("snapshot", snapshot, [symbol for symbol in known if symbol in added]))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender_task.cancel()
+        rate_hub.unregister(subscription)
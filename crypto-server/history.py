@@ -0,0 +1,144 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import text
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Sequence
+from datetime import datetime, timedelta, timezone
+import re
+import time
+
+from .auth import SCOPE_CURRENCY_READ, TokenGrant, normalize_symbol, require_scope
+from .models import CurrencyCandle
+from .replica import ReadSession, get_read_db
+from .ringbuffer import tick_buffer, window_stats
+from .snapshot import rate_snapshot
+
+router = APIRouter(
+    prefix="/currency",
+    tags=["Currency History"]
+)
+
+# Rozdzielczość -> długość przedziału w sekundach
+CANDLE_RESOLUTIONS = {"1m": 60, "5m": 300, "1h": 3600}
+
+# Jednostki parametru window w /stats
+WINDOW_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600}
+
+CANDLES_PAGE_SIZE = 1440
+CANDLES_PAGE_LIMIT = 5000
+
+
+# Tablice zamiast wierszy VALUES - liczba parametrów nie rośnie z liczbą symboli (limit 32767 w asyncpg)
+INSERT_TICKS = text("""
+    INSERT INTO currency_ticks (symbol, rate, ts)
+    SELECT t.symbol, t.rate, :ts
+    FROM unnest(CAST(:symbols AS text[]), CAST(:rates AS float8[])) AS t(symbol, rate)
+""")
+
+# Istniejąca świeca: open bez zmian, reszta przesuwana przyrostowo
+UPSERT_CANDLES = text("""
+    INSERT INTO currency_candles (symbol, resolution, bucket, open, high, low, close, ticks)
+    SELECT t.symbol, r.resolution, r.bucket, t.rate, t.rate, t.rate, t.rate, 1
+    FROM unnest(CAST(:symbols AS text[]), CAST(:rates AS float8[])) AS t(symbol, rate)
+    CROSS JOIN unnest(CAST(:resolutions AS text[]), CAST(:buckets AS timestamptz[])) AS r(resolution, bucket)
+    ON CONFLICT (symbol, resolution, bucket) DO UPDATE SET
+        high = GREATEST(currency_candles.high, EXCLUDED.high),
+        low = LEAST(currency_candles.low, EXCLUDED.low),
+        close = EXCLUDED.close,
+        ticks = currency_candles.ticks + 1
+""")
+
+
+def candle_bucket(ts: datetime, seconds: int) -> datetime:
+    return datetime.fromtimestamp(int(ts.timestamp()) // seconds * seconds, tz=timezone.utc)
+
+
+async def record_ticks(db: AsyncSession, symbols: Sequence[str], rates: Sequence[float], ts: datetime):
+    """Dopisuje ticki do historii i aktualizuje świece - dwa zapytania na tick niezależnie od liczby symboli.
+
+    Nie wykonuje commita: zapis ma trafić do tej samej transakcji co nowe kursy.
+    """
+    if not symbols:
+        return
+
+    params = {"symbols": list(symbols), "rates": list(rates), "ts": ts}
+    await db.execute(INSERT_TICKS, params)
+    await db.execute(UPSERT_CANDLES, {
+        **params,
+        "resolutions": list(CANDLE_RESOLUTIONS),
+        "buckets": [candle_bucket(ts, seconds) for seconds in CANDLE_RESOLUTIONS.values()],
+    })
+
+
+@router.get("/{symbol}/candles")
+async def get_candles(
+    symbol: str,
+    resolution: str = Query("1m", pattern="^(1m|5m|1h)$"),
+    since: Optional[datetime] = Query(None, description="Domyślnie tyle przedziałów wstecz, ile wynosi limit"),
+    until: Optional[datetime] = None,
+    limit: int = Query(CANDLES_PAGE_SIZE, ge=1, le=CANDLES_PAGE_LIMIT),
+    db: ReadSession = Depends(get_read_db),
+    grant: TokenGrant = Depends(require_scope(SCOPE_CURRENCY_READ))
+):
+    symbol = normalize_symbol(symbol)
+    if not grant.allows_symbol(symbol):
+        raise HTTPException(status_code=403, detail="Brak dostępu do tej waluty")
+
+    snapshot = rate_snapshot.current
+    if snapshot is not None and symbol not in snapshot.rows:
+        raise HTTPException(status_code=404, detail="Waluta nie znaleziona")
+
+    seconds = CANDLE_RESOLUTIONS[resolution]
+    if since is None:
+        since = candle_bucket(until or datetime.now(timezone.utc), seconds) - timedelta(seconds=seconds * (limit - 1))
+
+    # Klucz główny (symbol, resolution, bucket) obsługuje całe zapytanie
+    query = (
+        select(CurrencyCandle)
+        .where(CurrencyCandle.symbol == symbol)
+        .where(CurrencyCandle.resolution == resolution)
+        .where(CurrencyCandle.bucket >= since)
+        .order_by(CurrencyCandle.bucket)
+        .limit(limit)
+    )
+    if until is not None:
+        query = query.where(CurrencyCandle.bucket < until)
+
+    result = await db.execute(query)
+    return {
+        "symbol": symbol,
+        "resolution": resolution,
+        "candles": [
+            {
+                "time": candle.bucket,
+                "open": candle.open,
+                "high": candle.high,
+                "low": candle.low,
+                "close": candle.close,
+                "ticks": candle.ticks,
+            }
+            for candle in result.scalars().all()
+        ],
+    }
+
+
+@router.get("/{symbol}/stats")
+async def get_window_stats(
+    symbol: str,
+    window: str = Query("15m", pattern=r"^\d+[smh]?$", description="Np. 300, 300s, 15m, 1h"),
+    grant: TokenGrant = Depends(require_scope(SCOPE_CURRENCY_READ))
+):
+    symbol = normalize_symbol(symbol)
+    if not grant.allows_symbol(symbol):
+        raise HTTPException(status_code=403, detail="Brak dostępu do tej waluty")
+
+    value, unit = re.fullmatch(r"(\d+)([smh]?)", window).groups()
+    seconds = int(value) * WINDOW_UNITS[unit]
+    now = time.time()
+
+    # Bez zapytania do bazy - ostatnie ticki są w pamięci procesu (ringbuffer.TICK_BUFFER_SIZE)
+    samples = tick_buffer.window(symbol, seconds, now)
+    if samples is None:
+        raise HTTPException(status_code=404, detail="Waluta nie znaleziona")
+
+    return {"symbol": symbol, "window": seconds, **(window_stats(*samples, now) or {"samples": 0})}
@@ -0,0 +1,137 @@
+import os
+import secrets
+import time
+from typing import Dict, List, Optional
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose.backends import RSAKey
+
+ALGORITHM = "RS256"
+
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR", os.path.join(os.path.dirname(__file__), "keys"))
+# Ile najnowszych kluczy pozostaje ważnych do weryfikacji po rotacji
+JWT_MAX_KEYS = int(os.getenv("JWT_MAX_KEYS", "3"))
+# Co ile sekund worker sprawdza katalog kluczy (rotacja na innym workerze) - także przy nieznanym "kid"
+JWT_RELOAD_INTERVAL = float(os.getenv("JWT_RELOAD_INTERVAL", "5"))
+
+
+class KeyRing:
+    """Klucze RSA do podpisywania tokenów, parsowane raz i trzymane w pamięci.
+
+    Pliki w katalogu to `<kid>.pem`; kid zaczyna się od znacznika czasu
+    w nanosekundach, więc najnowszy klucz podpisuje, a kilka poprzednich
+    nadal weryfikuje.
+    """
+
+    def __init__(self, directory: str, max_keys: int):
+        self.directory = directory
+        self.max_keys = max_keys
+        self.signing_kid: Optional[str] = None
+        self._signing_key: Optional[RSAKey] = None
+        self._verification_keys: Dict[str, RSAKey] = {}
+        self._jwks: dict = {"keys": []}
+        self._files: List[str] = []
+        self._last_reload = 0.0
+
+    @staticmethod
+    def _created_ns(name: str) -> int:
+        # Starsze kid mają znacznik w sekundach (10 cyfr), nowe w nanosekundach
+        prefix = name.split("-", 1)[0]
+        if not prefix.isdigit():
+            return 0
+        return int(prefix) * 1_000_000_000 if len(prefix) <= 10 else int(prefix)
+
+    def _key_files(self) -> List[str]:
+        """Pliki kluczy od najstarszego do najnowszego - porządek liczbowy, nie napisów."""
+        if not os.path.isdir(self.directory):
+            return []
+        names = [name for name in os.listdir(self.directory) if name.endswith(".pem")]
+        return sorted(names, key=lambda name: (self._created_ns(name), name))
+
+    def load(self):
+        files = self._key_files()
+        if not files:
+            self._generate()
+            files = self._key_files()
+
+        verification_keys = {}
+        jwks = []
+        signing = None
+        for name in files[-self.max_keys:]:
+            kid = name[:-len(".pem")]
+            with open(os.path.join(self.directory, name), "rb") as f:
+                private_key = RSAKey(f.read(), ALGORITHM)
+
+            signing = (kid, private_key)
+            public_key = private_key.public_key()
+            verification_keys[kid] = public_key
+            jwks.append({**public_key.to_dict(), "kid": kid, "use": "sig"})
+
+        self.signing_kid, self._signing_key = signing
+        self._verification_keys = verification_keys
+        self._jwks = {"keys": list(reversed(jwks))}
+        self._files = files
+        self._last_reload = time.monotonic()
+
+    def _refresh(self):
+        """Przeładowuje klucze, jeśli zmienił się katalog - parsowanie tylko po rotacji."""
+        if self._signing_key is None:
+            self.load()
+        elif time.monotonic() - self._last_reload >= JWT_RELOAD_INTERVAL:
+            if self._key_files() != self._files:
+                self.load()
+            else:
+                self._last_reload = time.monotonic()
+
+    def _generate(self) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        # Znacznik w ns - kolejne rotacje w tej samej sekundzie sortują się poprawnie
+        kid = f"{time.time_ns()}-{secrets.token_hex(4)}"
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        pem = private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        )
+
+        path = os.path.join(self.directory, f"{kid}.pem")
+        tmp_path = path + ".tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(pem)
+        os.replace(tmp_path, path)
+        return kid
+
+    def rotate(self) -> str:
+        kid = self._generate()
+
+        # Klucze spoza okna weryfikacji nie są już potrzebne
+        for name in self._key_files()[:-self.max_keys]:
+            os.remove(os.path.join(self.directory, name))
+
+        self.load()
+        return kid
+
+    @property
+    def signing_key(self) -> RSAKey:
+        # Po rotacji na innym workerze podpisujemy nowym kluczem najpóźniej po JWT_RELOAD_INTERVAL
+        self._refresh()
+        return self._signing_key
+
+    def verification_key(self, kid: Optional[str]) -> Optional[RSAKey]:
+        self._refresh()
+
+        key = self._verification_keys.get(kid)
+        if key is None and time.monotonic() - self._last_reload >= JWT_RELOAD_INTERVAL:
+            # Inny worker mógł zrotować klucz - dociągnij zmiany z katalogu
+            self.load()
+            key = self._verification_keys.get(kid)
+        return key
+
+    def jwks(self) -> dict:
+        self._refresh()
+        return self._jwks
+
+
+key_ring = KeyRing(JWT_KEYS_DIR, JWT_MAX_KEYS)
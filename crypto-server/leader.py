@@ -0,0 +1,118 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional
+
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import DATABASE_URL
+from .notify import WORKER_ID
+from .snapshot import rate_snapshot
+from .tasks import CURRENCY_TICK_INTERVAL, currency_generator
+
+# Klucz blokady doradczej generatora (< 2^32, więc w pg_locks jest w całości w objid)
+GENERATOR_LOCK_ID = 0x63727970
+
+LOCK_HOLDER_QUERY = text("""
+    SELECT a.application_name, a.pid, a.backend_start
+    FROM pg_locks l JOIN pg_stat_activity a ON a.pid = l.pid
+    WHERE l.locktype = 'advisory' AND l.classid = 0 AND l.objid = :lock_id AND l.objsubid = 1 AND l.granted
+""")
+
+
+class Leadership:
+    def __init__(self):
+        self.is_leader = False
+        self.since: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+    def acquired(self):
+        self.is_leader = True
+        self.since = datetime.now(timezone.utc)
+
+    def released(self, error: Optional[str] = None):
+        self.is_leader = False
+        self.since = None
+        if error is not None:
+            self.last_error = error
+
+
+leadership = Leadership()
+
+
+async def _connect() -> asyncpg.Connection:
+    return await asyncpg.connect(
+        DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1),
+        server_settings={
+            # Nazwa workera widoczna w pg_stat_activity - stąd /health/generator zna lidera
+            "application_name": WORKER_ID,
+            # Martwy host lidera (bez FIN) zwalnia blokadę po kilku sekundach zamiast po 2 h
+            "tcp_keepalives_idle": "5",
+            "tcp_keepalives_interval": "1",
+            "tcp_keepalives_count": "3",
+        },
+    )
+
+
+async def _lead(connection: asyncpg.Connection):
+    generator = asyncio.create_task(currency_generator())
+    try:
+        while not generator.done():
+            await asyncio.wait({generator}, timeout=CURRENCY_TICK_INTERVAL)
+            if not generator.done():
+                # Utrata połączenia = utrata blokady - generator musi stanąć, zanim przejmie go inny worker
+                await connection.fetchval("SELECT 1")
+        generator.result()
+    finally:
+        generator.cancel()
+
+
+async def generator_election():
+    """Dokładnie jeden proces w klastrze uruchamia currency_generator.
+
+    Lider trzyma blokadę doradczą na sesji dedykowanego połączenia - blokada
+    znika razem z procesem lub połączeniem. Pozostałe workery co tick próbują
+    ją przejąć, a kursy dostają przez LISTEN/NOTIFY (listener.change_listener).
+    """
+    while True:
+        connection = None
+        try:
+            connection = await _connect()
+            while not await connection.fetchval("SELECT pg_try_advisory_lock($1)", GENERATOR_LOCK_ID):
+                await asyncio.sleep(CURRENCY_TICK_INTERVAL)
+
+            leadership.acquired()
+            print(f"👑 Worker {WORKER_ID} przejął generator kursów")
+            await _lead(connection)
+            leadership.released()
+        except asyncio.CancelledError:
+            leadership.released()
+            raise
+        except Exception as e:
+            leadership.released(str(e))
+            print(f"⚠️  Generator kursów zatrzymany: {e}")
+        finally:
+            if connection is not None and not connection.is_closed():
+                await connection.close()
+
+        await asyncio.sleep(CURRENCY_TICK_INTERVAL)
+
+
+async def generator_status(db: AsyncSession) -> dict:
+    result = await db.execute(LOCK_HOLDER_QUERY, {"lock_id": GENERATOR_LOCK_ID})
+    holder = result.first()
+    snapshot = rate_snapshot.current
+    return {
+        "worker": WORKER_ID,
+        "is_leader": leadership.is_leader,
+        "leader_since": leadership.since,
+        "leader": None if holder is None else {
+            "worker": holder.application_name,
+            "backend_pid": holder.pid,
+            "connected_at": holder.backend_start,
+        },
+        # Ostatni tick widziany przez ten worker (własny albo z powiadomienia)
+        "last_tick": None if snapshot is None else snapshot.last_updated,
+        "last_error": leadership.last_error,
+    }
@@ -0,0 +1,149 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Set
+
+import asyncpg
+from sqlalchemy import any_
+from sqlalchemy.future import select
+
+from .auth import client_cache, introspection_cache, invalidate_client
+from .currency import publish_rates
+from .database import DATABASE_URL, AsyncSessionLocal
+from .models import CurrencyRate
+from .notify import CLIENTS_CHANNEL, RATES_CHANNEL, WORKER_ID
+from .ringbuffer import TICK_BUFFER_SIZE, tick_buffer
+from .snapshot import rate_snapshot
+from .tasks import CURRENCY_TICK_INTERVAL
+
+LISTEN_RECONNECT_DELAY = 1
+# Półotwarte połączenie TCP nie zgłasza zamknięcia - co jakiś czas sprawdzamy je zapytaniem
+LISTEN_HEALTHCHECK_INTERVAL = 30
+
+
+class RateRefresher:
+    """Odświeża snapshot kursów po powiadomieniu z innego workera.
+
+    Powiadomienia przychodzące w trakcie odświeżania są scalane - przy
+    zalewie ticków worker czyta bazę raz na rundę, a nie raz na NOTIFY.
+    """
+
+    def __init__(self):
+        self._pending = False
+        # None = wszystkie symbole
+        self._symbols: Optional[Set[str]] = set()
+        self._version: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def request(self, symbols: Optional[list], version: Optional[int]):
+        if symbols is None or self._symbols is None:
+            self._symbols = None
+        else:
+            self._symbols.update(symbols)
+        if version is not None:
+            self._version = max(self._version or 0, version)
+        self._pending = True
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while self._pending:
+            symbols, version = self._symbols, self._version
+            self._pending, self._symbols, self._version = False, set(), None
+            try:
+                await refresh_rates(None if symbols is None else sorted(symbols), version)
+            except Exception as e:
+                print(f"⚠️  Błąd odświeżania kursów po powiadomieniu: {e}")
+
+
+async def refresh_rates(symbols: Optional[list], version: Optional[int] = None):
+    query = (
+        select(CurrencyRate.symbol, CurrencyRate.rate, CurrencyRate.change_24h, CurrencyRate.last_updated)
+        .order_by(CurrencyRate.id)
+    )
+    if symbols is not None:
+        query = query.where(CurrencyRate.symbol == any_(symbols))
+
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(query)).all()
+    if not rows:
+        return
+
+    last_updated = max(row.last_updated for row in rows)
+    # Ta sama wersja co u generatora (ms czasu ticku) - ETagi zgadzają się między workerami
+    version = version or int(last_updated.timestamp() * 1000)
+    # Powiadomienia przychodzą w kolejności commitów, więc pomijamy tylko duplikaty
+    current = rate_snapshot.current
+    if current is not None and current.version == version:
+        return
+
+    changed = [row.symbol for row in rows]
+    rates = [row.rate for row in rows]
+    publish_rates(
+        changed, rates, [row.change_24h or 0.0 for row in rows], version, last_updated,
+        partial=symbols is not None,
+    )
+    tick_buffer.append(last_updated.timestamp(), changed, rates)
+
+
+rate_refresher = RateRefresher()
+
+
+async def restore_tick_buffer():
+    # Każdy worker (nie tylko lider) serwuje /stats z bufora - historia sprzed startu jest w currency_ticks
+    horizon = timedelta(seconds=CURRENCY_TICK_INTERVAL * TICK_BUFFER_SIZE)
+    async with AsyncSessionLocal() as db:
+        await tick_buffer.restore(db, datetime.now(timezone.utc) - horizon)
+
+
+def _on_notification(connection, pid, channel, payload):
+    try:
+        message = json.loads(payload)
+    except ValueError:
+        return
+    if message.get("origin") == WORKER_ID:
+        return
+
+    if channel == RATES_CHANNEL:
+        rate_refresher.request(message.get("symbols"), message.get("version"))
+    elif channel == CLIENTS_CHANNEL:
+        invalidate_client(message["client_id"])
+
+
+async def change_listener():
+    """Jedno dedykowane połączenie LISTEN na worker, poza pulą SQLAlchemy."""
+    dsn = DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+    while True:
+        try:
+            connection = await asyncpg.connect(dsn)
+        except Exception as e:
+            print(f"⚠️  Błąd połączenia LISTEN: {e}")
+            await asyncio.sleep(LISTEN_RECONNECT_DELAY)
+            continue
+
+        closed = asyncio.Event()
+        connection.add_termination_listener(lambda _: closed.set())
+        try:
+            await connection.add_listener(RATES_CHANNEL, _on_notification)
+            await connection.add_listener(CLIENTS_CHANNEL, _on_notification)
+
+            # Powiadomienia z czasu bez połączenia przepadły - pełne odświeżenie stanu
+            client_cache.clear()
+            introspection_cache.clear()
+            await restore_tick_buffer()
+            rate_refresher.request(None, None)
+
+            while not closed.is_set():
+                try:
+                    await asyncio.wait_for(closed.wait(), LISTEN_HEALTHCHECK_INTERVAL)
+                except asyncio.TimeoutError:
+                    await connection.execute("SELECT 1")
+            print("⚠️  Połączenie LISTEN zerwane, ponowne łączenie...")
+        except Exception as e:
+            print(f"⚠️  Błąd nasłuchu powiadomień: {e}")
+        finally:
+            if not connection.is_closed():
+                await connection.close()
+
+        await asyncio.sleep(LISTEN_RECONNECT_DELAY)
@@ -1,25 +1,53 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Response
 import asyncio
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from .database import engine, Base
+from fastapi.responses import FileResponse, JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import engine, get_db, pool_stats, read_engine
+from .keys import key_ring
+from .migrations import MIGRATE_ON_STARTUP, SCHEMA_VERSION, apply_migrations, current_version
+from .snapshot import rate_snapshot
 
-from .auth import router as auth_router
+from .auth import router as auth_router, verify_admin_secret
+from .clients import router as clients_router
 from .currency import router as currency_router
-from .tasks import currency_generator
+from .history import router as history_router
+from .leader import generator_election, generator_status
+from .ratelimit import rate_limit_pruner
+from .revocation import revocation_sync
+from .listener import change_listener
+from .replica import replica_monitor, replica_state
+from .usage import flush_usage, usage_flusher
+
+# Ile /ready czeka na bazę, zanim uzna ją za niedostępną
+READY_CHECK_TIMEOUT = 2
 
 app = FastAPI()
 
 @app.on_event("startup")
 async def startup():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    print("Tabele gotowe!")
+    if MIGRATE_ON_STARTUP:
+        version = await apply_migrations()
+        print(f"Tabele gotowe (schemat w wersji {version})!")
+
+    key_ring.load()
+
+    asyncio.create_task(generator_election())
+    asyncio.create_task(revocation_sync())
+    asyncio.create_task(usage_flusher())
+    asyncio.create_task(rate_limit_pruner())
+    asyncio.create_task(change_listener())
+    if read_engine is not None:
+        asyncio.create_task(replica_monitor())
 
-    asyncio.create_task(currency_generator())
+@app.on_event("shutdown")
+async def shutdown():
+    await flush_usage()
 
 app.include_router(auth_router, prefix="/api")
+app.include_router(clients_router, prefix="/api")
 app.include_router(currency_router, prefix="/api")
+app.include_router(history_router, prefix="/api")
 
 app.mount("/static", StaticFiles(directory="crypto-server/static"), name="static")
 
@@ -27,6 +55,55 @@ app.mount("/static", StaticFiles(directory="crypto-server/static"), name="static
 async def health_check():
     return {"status": "ok", "service": "crypto-server"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Gotowość do ruchu: pula połączeń, aktualny schemat i pierwszy snapshot kursów."""
+    checks = {"database": False, "schema_version": None, "required_schema_version": SCHEMA_VERSION}
+
+    async def read_schema_version():
+        async with engine.connect() as conn:
+            return await current_version(conn)
+
+    try:
+        checks["schema_version"] = await asyncio.wait_for(read_schema_version(), READY_CHECK_TIMEOUT)
+        checks["database"] = True
+    except Exception as e:
+        checks["error"] = str(e) or type(e).__name__
+
+    snapshot = rate_snapshot.current
+    checks["snapshot_version"] = None if snapshot is None else snapshot.version
+
+    # Nowszy schemat jest w porządku - przy rolling restarcie migruje pierwszy nowy worker
+    ready = (
+        checks["database"]
+        and (checks["schema_version"] or 0) >= SCHEMA_VERSION
+        and snapshot is not None
+    )
+    return JSONResponse(
+        {"status": "ready" if ready else "starting", **checks},
+        status_code=200 if ready else 503,
+    )
+
+@app.get("/health/generator")
+async def generator_health(db: AsyncSession = Depends(get_db)):
+    return await generator_status(db)
+
+@app.get("/health/pool", dependencies=[Depends(verify_admin_secret)])
+async def pool_health():
+    stats = {"primary": pool_stats(engine)}
+    if read_engine is not None:
+        stats["replica"] = pool_stats(read_engine)
+    return stats
+
+@app.get("/health/replica")
+async def replica_health():
+    return replica_state.status()
+
+@app.get("/.well-known/jwks.json")
+async def jwks(response: Response):
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return key_ring.jwks()
+
 @app.get("/")
 async def root():
     return FileResponse("crypto-server/static/index.html")
@@ -0,0 +1,205 @@
+"""Wersjonowane migracje schematu.
+
+Uruchamiane przy starcie workera (MIGRATE_ON_STARTUP) albo osobno przed
+wdrożeniem:
+
+    python -m crypto-server.migrations [--check]
+"""
+import asyncio
+import os
+import sys
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from .database import engine
+
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() == "true"
+
+# Klucz blokady doradczej migracji - równolegle startujące workery czekają na pierwszy
+SCHEMA_LOCK_ID = 0x63727971
+
+CREATE_SCHEMA_VERSION = text("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description VARCHAR NOT NULL,
+        applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+""")
+
+# Schemat w wersji 1, zamrożony - odpowiada modelom z chwili wprowadzenia migracji.
+# IF NOT EXISTS, bo bazy sprzed wersjonowania mają już część tabel z create_all.
+BASELINE = [
+    """
+    CREATE TABLE IF NOT EXISTS clients (
+        id SERIAL PRIMARY KEY,
+        client_id VARCHAR NOT NULL,
+        client_secret VARCHAR NOT NULL,
+        app_name VARCHAR,
+        is_active BOOLEAN,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+        rate_limit_per_minute INTEGER,
+        token_limit_per_minute INTEGER,
+        scopes VARCHAR,
+        allowed_symbols VARCHAR
+    )
+    """,
+    # Kolumny dodawane do clients przed wersjonowaniem
+    "ALTER TABLE clients ADD COLUMN IF NOT EXISTS rate_limit_per_minute INTEGER",
+    "ALTER TABLE clients ADD COLUMN IF NOT EXISTS token_limit_per_minute INTEGER",
+    "ALTER TABLE clients ADD COLUMN IF NOT EXISTS scopes VARCHAR",
+    "ALTER TABLE clients ADD COLUMN IF NOT EXISTS allowed_symbols VARCHAR",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_clients_client_id ON clients (client_id)",
+    "CREATE INDEX IF NOT EXISTS ix_clients_id ON clients (id)",
+    "CREATE INDEX IF NOT EXISTS ix_clients_is_active_id ON clients (is_active, id)",
+    "CREATE INDEX IF NOT EXISTS ix_clients_created_at ON clients (created_at)",
+    """
+    CREATE TABLE IF NOT EXISTS currency_rates_live (
+        id SERIAL PRIMARY KEY,
+        symbol VARCHAR,
+        rate FLOAT NOT NULL,
+        open_price FLOAT,
+        change_24h FLOAT,
+        last_updated TIMESTAMP WITH TIME ZONE DEFAULT now()
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_currency_rates_live_id ON currency_rates_live (id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_currency_rates_live_symbol ON currency_rates_live (symbol)",
+    """
+    CREATE TABLE IF NOT EXISTS currency_ticks (
+        id BIGSERIAL PRIMARY KEY,
+        symbol VARCHAR NOT NULL,
+        rate FLOAT NOT NULL,
+        ts TIMESTAMP WITH TIME ZONE NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_currency_ticks_symbol_ts ON currency_ticks (symbol, ts)",
+    "CREATE INDEX IF NOT EXISTS ix_currency_ticks_ts_brin ON currency_ticks USING brin (ts)",
+    """
+    CREATE TABLE IF NOT EXISTS currency_candles (
+        symbol VARCHAR NOT NULL,
+        resolution VARCHAR NOT NULL,
+        bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+        open FLOAT NOT NULL,
+        high FLOAT NOT NULL,
+        low FLOAT NOT NULL,
+        close FLOAT NOT NULL,
+        ticks INTEGER NOT NULL,
+        PRIMARY KEY (symbol, resolution, bucket)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+        key VARCHAR PRIMARY KEY,
+        tokens FLOAT NOT NULL,
+        allowed BOOLEAN NOT NULL,
+        updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS revoked_tokens (
+        id SERIAL PRIMARY KEY,
+        jti VARCHAR NOT NULL UNIQUE,
+        client_id VARCHAR NOT NULL,
+        expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+        revoked_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_revoked_tokens_expires_at ON revoked_tokens (expires_at)",
+    """
+    CREATE TABLE IF NOT EXISTS client_usage (
+        client_id VARCHAR NOT NULL,
+        kind VARCHAR NOT NULL,
+        bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+        count BIGINT NOT NULL,
+        PRIMARY KEY (client_id, kind, bucket)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_client_usage_bucket ON client_usage (bucket)",
+]
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    statements: List[str]
+
+
+# Tylko dopisywanie na końcu. Każda zmiana w models.py to nowa migracja z jawnym DDL -
+# zastosowanych wersji nie wolno zmieniać.
+MIGRATIONS: List[Migration] = [
+    Migration(1, "schemat bazowy", BASELINE),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+async def current_version(conn: AsyncConnection) -> Optional[int]:
+    """Wersja schematu w bazie; None = baza bez tabeli schema_version."""
+    exists = await conn.scalar(text("SELECT to_regclass('schema_version') IS NOT NULL"))
+    if not exists:
+        return None
+    return await conn.scalar(text("SELECT max(version) FROM schema_version"))
+
+
+async def apply_migrations(target: AsyncEngine = engine) -> int:
+    # Wszystko w jednej transakcji (DDL w Postgresie jest transakcyjny) pod blokadą -
+    # drugi worker czeka i widzi już zastosowane wersje zamiast ścigać się o CREATE TABLE
+    async with target.begin() as conn:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": SCHEMA_LOCK_ID})
+        await conn.execute(CREATE_SCHEMA_VERSION)
+        version = await current_version(conn) or 0
+
+        for migration in MIGRATIONS:
+            if migration.version <= version:
+                continue
+            print(f"   🔧 Migracja {migration.version}: {migration.description}")
+            for statement in migration.statements:
+                await conn.execute(text(statement))
+            await conn.execute(
+                text("INSERT INTO schema_version (version, description) VALUES (:version, :description)"),
+                {"version": migration.version, "description": migration.description},
+            )
+            version = migration.version
+
+    return version
+
+
+def schema_drift(sync_conn) -> List[str]:
+    """Tabele, kolumny i indeksy z models.py, których migracje nie utworzyły."""
+    from . import models  # noqa: F401 - rejestruje tabele w Base.metadata
+    from .database import Base
+
+    inspector = inspect(sync_conn)
+    existing_tables = set(inspector.get_table_names())
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            missing.append(f"tabela {table.name}")
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        missing += [f"kolumna {table.name}.{column.name}" for column in table.columns if column.name not in columns]
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        missing += [f"indeks {index.name}" for index in table.indexes if index.name not in indexes]
+    return missing
+
+
+async def _main(check: bool):
+    version = await apply_migrations()
+    print(f"✅ Schemat w wersji {version}")
+
+    if check:
+        async with engine.connect() as conn:
+            missing = await conn.run_sync(schema_drift)
+        await engine.dispose()
+        if missing:
+            raise SystemExit("❌ Modele wymagają nowej migracji: " + ", ".join(missing))
+        print("✅ Schemat zgodny z modelami")
+    else:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    # --check: po migracji porównuje schemat z models.py (np. w CI przed wdrożeniem)
+    asyncio.run(_main("--check" in sys.argv[1:]))
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, DateTime, Float, Integer, String
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Float, Index, Integer, String
 from sqlalchemy.sql import func
 
 from .database import Base
@@ -9,11 +9,23 @@ class ClientApp(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     client_id = Column(String, unique=True, index=True, nullable=False)
-    # hash the passwords
+    # hash scrypt (security.hash_secret)
     client_secret = Column(String, nullable=False)
     app_name = Column(String)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Własne limity na minutę (NULL = domyślne z ratelimit.py, 0 = bez limitu)
+    rate_limit_per_minute = Column(Integer, nullable=True)
+    token_limit_per_minute = Column(Integer, nullable=True)
+    # Zakresy oddzielone spacją i symbole oddzielone przecinkiem (NULL = wszystkie)
+    scopes = Column(String, nullable=True)
+    allowed_symbols = Column(String, nullable=True)
+
+    # Stronicowanie po id (keyset) z filtrem is_active / zakresem created_at
+    __table_args__ = (
+        Index("ix_clients_is_active_id", "is_active", "id"),
+        Index("ix_clients_created_at", "created_at"),
+    )
 
 
 class CurrencyRate(Base):
@@ -22,8 +34,77 @@ class CurrencyRate(Base):
     id = Column(Integer, primary_key=True, index=True)
     symbol = Column(String, unique=True, index=True)
     rate = Column(Float, nullable=False)
+    # Kurs sprzed 24h (rolling.RollingReference), względem którego liczone jest change_24h
     open_price = Column(Float, nullable=True)
     change_24h = Column(Float, default=0.0)
     last_updated = Column(
         DateTime(timezone=True), onupdate=func.now(), server_default=func.now()
     )
+
+
+class CurrencyTick(Base):
+    """Historia kursów - tylko dopisywanie, jeden wiersz na symbol na tick."""
+    __tablename__ = "currency_ticks"
+
+    id = Column(BigInteger, primary_key=True)
+    symbol = Column(String, nullable=False)
+    rate = Column(Float, nullable=False)
+    ts = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_currency_ticks_symbol_ts", "symbol", "ts"),
+        # Wiersze trafiają w kolejności czasu - BRIN jest o rzędy wielkości mniejszy od B-drzewa
+        Index("ix_currency_ticks_ts_brin", "ts", postgresql_using="brin"),
+    )
+
+
+class CurrencyCandle(Base):
+    """Świece OHLC aktualizowane przyrostowo przy każdym ticku (history.record_ticks)."""
+    __tablename__ = "currency_candles"
+
+    symbol = Column(String, primary_key=True)
+    # "1m", "5m" lub "1h"
+    resolution = Column(String, primary_key=True)
+    # Początek przedziału (UTC)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    # Liczba ticków w przedziale
+    ticks = Column(Integer, nullable=False, default=1)
+
+
+class RateLimitBucket(Base):
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String, primary_key=True)
+    tokens = Column(Float, nullable=False)
+    allowed = Column(Boolean, nullable=False, default=True)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True)
+    jti = Column(String, unique=True, nullable=False)
+    client_id = Column(String, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ClientUsage(Base):
+    __tablename__ = "client_usage"
+
+    client_id = Column(String, primary_key=True)
+    # "token" lub "currency"
+    kind = Column(String, primary_key=True)
+    # Początek minuty (UTC)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_client_usage_bucket", "bucket"),
+    )
+
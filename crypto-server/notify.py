@@ -0,0 +1,30 @@
+import json
+import os
+import socket
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+RATES_CHANNEL = "rate_updates"
+CLIENTS_CHANNEL = "client_updates"
+
+# Limit treści NOTIFY to 8000 bajtów - dłuższą listę symboli zastępuje null ("wszystkie")
+NOTIFY_PAYLOAD_LIMIT = 7900
+
+# Nadawca powiadomienia - worker pomija własne, bo jego stan jest już aktualny
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}"
+
+
+async def notify(db: AsyncSession, channel: str, payload: dict):
+    """Wysyła NOTIFY w bieżącej transakcji - słuchacze dostaną je dopiero po commicie."""
+    await db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": channel, "payload": json.dumps({"origin": WORKER_ID, **payload}, separators=(",", ":"))},
+    )
+
+
+def rates_payload(version: int, symbols) -> dict:
+    payload = {"version": version, "symbols": list(symbols)}
+    if len(json.dumps(payload)) > NOTIFY_PAYLOAD_LIMIT:
+        payload["symbols"] = None
+    return payload
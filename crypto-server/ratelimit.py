@@ -0,0 +1,137 @@
+import asyncio
+import os
+import time
+
+from sqlalchemy import text
+
+from .cache import TTLCache
+from .database import engine
+
+# Domyślne limity (na minutę) dla klientów bez własnych ustawień; 0 = bez limitu
+RATE_LIMIT_PER_MINUTE = int(os.getenv("RATE_LIMIT_PER_MINUTE", "120"))
+TOKEN_LIMIT_PER_MINUTE = int(os.getenv("TOKEN_LIMIT_PER_MINUTE", "10"))
+# Nieudane logowania na parę (klient, adres źródłowy), a dla nieznanych client_id na sam adres -
+# nie zużywają limitu wydawania tokenów
+TOKEN_FAILURE_LIMIT_PER_MINUTE = int(os.getenv("TOKEN_FAILURE_LIMIT_PER_MINUTE", "10"))
+
+# "memory" - osobne kubełki w każdym procesie, "postgres" - wspólne dla wszystkich workerów
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+# Górna granica liczby kubełków w pamięci procesu - przy przepełnieniu wypada najdawniej używany
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "100000"))
+RATE_LIMIT_PRUNE_INTERVAL = float(os.getenv("RATE_LIMIT_PRUNE_INTERVAL", "60"))
+
+# Pojemność kubełka to limit na minutę, więc po minucie bezczynności jest pełny -
+# tak samo jak kubełek, którego nie ma, i można go usunąć
+BUCKET_REFILL_SECONDS = 60
+
+
+class InMemoryRateLimitBackend:
+    """Token bucket w pamięci procesu: O(1) na zapytanie, bez I/O."""
+
+    def __init__(self):
+        self._buckets = TTLCache(maxsize=RATE_LIMIT_MAX_BUCKETS, ttl=BUCKET_REFILL_SECONDS)
+
+    async def consume(self, key: str, rate: float, capacity: float) -> float:
+        """Pobiera jeden żeton; zwraca 0 lub liczbę sekund do ponowienia."""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [capacity, now]
+        # Wpis żyje do ponownego zapełnienia kubełka
+        self._buckets.set(key, bucket, ttl=capacity / rate)
+
+        tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return 0.0
+
+        bucket[0] = tokens
+        return (1 - tokens) / rate
+
+    async def prune(self):
+        # Wygasłe kubełki TTLCache usuwa przy odczycie, a ich liczbę ogranicza maxsize
+        pass
+
+    def reset(self):
+        self._buckets.clear()
+
+
+class PostgresRateLimitBackend:
+    """Token bucket w tabeli rate_limit_buckets - jedno atomowe zapytanie na żądanie."""
+
+    _CONSUME = text("""
+        INSERT INTO rate_limit_buckets (key, tokens, allowed, updated_at)
+        VALUES (:key, :capacity - 1, true, clock_timestamp())
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = CASE
+                WHEN LEAST(:capacity, rate_limit_buckets.tokens
+                    + EXTRACT(EPOCH FROM clock_timestamp() - rate_limit_buckets.updated_at) * :rate) >= 1
+                THEN LEAST(:capacity, rate_limit_buckets.tokens
+                    + EXTRACT(EPOCH FROM clock_timestamp() - rate_limit_buckets.updated_at) * :rate) - 1
+                ELSE LEAST(:capacity, rate_limit_buckets.tokens
+                    + EXTRACT(EPOCH FROM clock_timestamp() - rate_limit_buckets.updated_at) * :rate)
+            END,
+            allowed = LEAST(:capacity, rate_limit_buckets.tokens
+                + EXTRACT(EPOCH FROM clock_timestamp() - rate_limit_buckets.updated_at) * :rate) >= 1,
+            updated_at = clock_timestamp()
+        RETURNING tokens, allowed
+    """)
+
+    _PRUNE = text("""
+        DELETE FROM rate_limit_buckets
+        WHERE updated_at < clock_timestamp() - make_interval(secs => :idle)
+    """)
+
+    async def consume(self, key: str, rate: float, capacity: float) -> float:
+        async with engine.begin() as conn:
+            result = await conn.execute(self._CONSUME, {"key": key, "rate": rate, "capacity": capacity})
+            tokens, allowed = result.one()
+
+        if allowed:
+            return 0.0
+        return (1 - tokens) / rate
+
+    async def prune(self):
+        async with engine.begin() as conn:
+            await conn.execute(self._PRUNE, {"idle": BUCKET_REFILL_SECONDS})
+
+    def reset(self):
+        pass
+
+
+class RateLimiter:
+    def __init__(self, backend):
+        self.backend = backend
+        self.rejected = 0
+
+    async def check(self, scope: str, client_id: str, per_minute: int) -> float:
+        """Zwraca 0 gdy zapytanie mieści się w limicie, inaczej Retry-After w sekundach."""
+        if per_minute <= 0:
+            return 0.0
+
+        retry_after = await self.backend.consume(f"{scope}:{client_id}", per_minute / 60.0, float(per_minute))
+        if retry_after > 0:
+            self.rejected += 1
+        return retry_after
+
+
+def create_backend(name: str):
+    if name == "postgres":
+        return PostgresRateLimitBackend()
+    if name == "memory":
+        return InMemoryRateLimitBackend()
+    raise ValueError(f"Nieznany backend limitów: {name}")
+
+
+rate_limiter = RateLimiter(create_backend(RATE_LIMIT_BACKEND))
+
+
+async def rate_limit_pruner():
+    while True:
+        await asyncio.sleep(RATE_LIMIT_PRUNE_INTERVAL)
+        try:
+            await rate_limiter.backend.prune()
+        except Exception as e:
+            print(f"⚠️  Błąd czyszczenia kubełków limitów: {e}")
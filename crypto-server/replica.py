@@ -0,0 +1,137 @@
+import asyncio
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import exc, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from .database import AsyncSessionLocal, ReadSessionLocal, read_engine
+from .models import CurrencyRate
+from .snapshot import rate_snapshot
+
+# Maksymalne opóźnienie repliki (s), przy którym czytamy z niej. Opóźnienie mierzymy
+# kursami, więc musi być większe niż CURRENCY_TICK_INTERVAL
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "5"))
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "1"))
+
+
+class ReplicaState:
+    """Czy odczyty mogą iść do repliki - aktualizowane przez replica_monitor."""
+
+    def __init__(self):
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.checked_at: Optional[datetime] = None
+
+    @property
+    def usable(self) -> bool:
+        return read_engine is not None and self.healthy
+
+    def update(self, lag: Optional[float], error: Optional[str] = None):
+        self.lag = lag
+        self.healthy = error is None and lag is not None and lag <= REPLICA_MAX_LAG
+        if error is not None:
+            self.last_error = error
+        self.checked_at = datetime.now(timezone.utc)
+
+    def status(self) -> dict:
+        return {
+            "configured": read_engine is not None,
+            "healthy": self.healthy,
+            "lag_seconds": None if self.lag is None else round(self.lag, 3),
+            "max_lag_seconds": REPLICA_MAX_LAG,
+            "checked_at": self.checked_at,
+            "last_error": self.last_error,
+        }
+
+
+replica_state = ReplicaState()
+
+
+async def check_replica():
+    async with read_engine.connect() as conn:
+        replica_updated = await conn.scalar(select(func.max(CurrencyRate.last_updated)))
+
+    # Generator zapisuje kursy co tick - ostatni tick znany z primary (snapshot)
+    # kontra ostatni widoczny na replice daje opóźnienie niezależne od rodzaju replikacji
+    snapshot = rate_snapshot.current
+    if snapshot is None or replica_updated is None:
+        replica_state.update(None)
+        return
+    replica_state.update(max((snapshot.last_updated - replica_updated).total_seconds(), 0.0))
+
+
+async def replica_monitor():
+    while True:
+        try:
+            await check_replica()
+        except Exception as e:
+            replica_state.update(None, str(e) or type(e).__name__)
+
+        await asyncio.sleep(REPLICA_CHECK_INTERVAL)
+
+
+async def open_read_session() -> AsyncSession:
+    """Sesja tylko do odczytu: replika, jeśli jest zdrowa, w przeciwnym razie primary."""
+    if replica_state.usable:
+        session = ReadSessionLocal()
+        try:
+            await session.connection()
+            return session
+        except Exception as e:
+            # Nie czekamy na następne sprawdzenie - kolejne żądania od razu idą do primary
+            await session.close()
+            replica_state.update(None, str(e) or type(e).__name__)
+    return AsyncSessionLocal()
+
+
+class ReadSession:
+    """Leniwa sesja odczytu - replika albo primary wybierane dopiero przy pierwszym zapytaniu.
+
+    Żądania obsłużone ze snapshotu i z client_cache nie pobierają połączenia z żadnej puli.
+    """
+
+    def __init__(self):
+        self._session: Optional[AsyncSession] = None
+
+    async def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = await open_read_session()
+        return self._session
+
+    async def execute(self, statement, params=None):
+        session = await self.session()
+        try:
+            return await session.execute(statement, params)
+        except (exc.InterfaceError, exc.OperationalError) as e:
+            if not is_replica_session(session):
+                raise
+            # Połączenie z puli repliki zerwane (bez pre-pingu wychodzi to dopiero przy zapytaniu) -
+            # odczyt powtarzamy na primary
+            await session.close()
+            replica_state.update(None, str(e) or type(e).__name__)
+            self._session = AsyncSessionLocal()
+            return await self._session.execute(statement, params)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> "ReadSession":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+def is_replica_session(db: AsyncSession) -> bool:
+    return read_engine is not None and db.bind is read_engine
+
+
+async def get_read_db():
+    async with ReadSession() as session:
+        yield session
@@ -0,0 +1,77 @@
+import asyncio
+import heapq
+import os
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import delete
+from sqlalchemy.future import select
+
+from .database import AsyncSessionLocal
+from .models import RevokedToken
+
+REVOCATION_SYNC_INTERVAL = float(os.getenv("REVOCATION_SYNC_INTERVAL", "1"))
+# Wiersze z niższym id mogą zostać zatwierdzone później niż wyższe - czytamy z zakładką
+REVOCATION_SYNC_OVERLAP = 100
+
+
+class RevocationList:
+    """Unieważnione jti trzymane w pamięci do czasu wygaśnięcia tokenu.
+
+    Sprawdzenie to jedno wyszukiwanie w słowniku, więc nie dokłada
+    zapytania do bazy w get_current_client.
+    """
+
+    def __init__(self):
+        self._revoked: dict = {}
+        self._expiry_heap: list = []
+        self.last_id = 0
+
+    def add(self, jti: str, expires_at: float):
+        if expires_at <= time.time() or jti in self._revoked:
+            return
+        self._revoked[jti] = expires_at
+        heapq.heappush(self._expiry_heap, (expires_at, jti))
+
+    def is_revoked(self, jti) -> bool:
+        return jti in self._revoked
+
+    def prune(self):
+        now = time.time()
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            _, jti = heapq.heappop(self._expiry_heap)
+            self._revoked.pop(jti, None)
+
+    def __len__(self):
+        return len(self._revoked)
+
+
+revocation_list = RevocationList()
+
+
+async def sync_revocations(db):
+    """Dociąga unieważnienia zapisane przez inne workery od ostatniej synchronizacji."""
+    result = await db.execute(
+        select(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at)
+        .where(RevokedToken.id > revocation_list.last_id - REVOCATION_SYNC_OVERLAP)
+        .where(RevokedToken.expires_at > datetime.now(timezone.utc))
+        .order_by(RevokedToken.id)
+    )
+    for row_id, jti, expires_at in result.all():
+        revocation_list.add(jti, expires_at.timestamp())
+        revocation_list.last_id = max(revocation_list.last_id, row_id)
+
+
+async def revocation_sync():
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                await sync_revocations(db)
+
+                revocation_list.prune()
+                await db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.now(timezone.utc)))
+                await db.commit()
+        except Exception as e:
+            print(f"⚠️  Błąd synchronizacji unieważnionych tokenów: {e}")
+
+        await asyncio.sleep(REVOCATION_SYNC_INTERVAL)
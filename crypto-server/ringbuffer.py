@@ -0,0 +1,147 @@
+import os
+from datetime import datetime, timezone
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Liczba ostatnich ticków trzymanych w pamięci (przy ticku co 3 s: 1200 = 1 h)
+TICK_BUFFER_SIZE = int(os.getenv("TICK_BUFFER_SIZE", "1200"))
+
+# Ostatnie `capacity` ticków: jeden wiersz na symbol, znaczniki i kursy jako tablice float64
+# (big-endian z float8send) - bez obiektu Pythona na każdy tick każdego symbolu
+RESTORE_TICKS = text("""
+    SELECT symbol,
+           string_agg(float8send(date_part('epoch', ts)), ''::bytea ORDER BY ts) AS ts,
+           string_agg(float8send(rate), ''::bytea ORDER BY ts) AS rates
+    FROM currency_ticks
+    WHERE ts >= (
+        SELECT min(ts) FROM (
+            SELECT DISTINCT ts FROM currency_ticks WHERE ts >= :since ORDER BY ts DESC LIMIT :capacity
+        ) AS recent
+    )
+    GROUP BY symbol
+""")
+
+
+class TickBuffer:
+    """Bufor cykliczny ostatnich kursów, kolumnowy: jedna kolumna float64 na symbol.
+
+    Generator aktualizuje wszystkie symbole naraz, więc znaczniki czasu są
+    wspólne. Macierz jest w układzie kolumnowym (order="F"), żeby historia
+    jednego symbolu była ciągłym blokiem pamięci. Zajętość jest stała:
+    capacity * (liczba symboli + 1) * 8 bajtów.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.ts = np.full(capacity, np.nan)
+        self.rates = np.full((capacity, 0), np.nan, order="F")
+        self.columns: Dict[str, int] = {}
+        self.count = 0
+        # Generator przekazuje co tick tę samą listę symboli - indeksy kolumn liczymy raz
+        self._last_symbols: Optional[Sequence[str]] = None
+        self._last_columns: Optional[np.ndarray] = None
+
+    def _columns_for(self, symbols: Sequence[str]) -> np.ndarray:
+        if symbols is self._last_symbols:
+            return self._last_columns
+
+        new = [symbol for symbol in symbols if symbol not in self.columns]
+        if new:
+            grown = np.full((self.capacity, len(self.columns) + len(new)), np.nan, order="F")
+            grown[:, :len(self.columns)] = self.rates
+            for symbol in new:
+                self.columns[symbol] = len(self.columns)
+            self.rates = grown
+
+        self._last_symbols = symbols
+        self._last_columns = np.fromiter((self.columns[symbol] for symbol in symbols), dtype=np.intp, count=len(symbols))
+        return self._last_columns
+
+    @property
+    def last_ts(self) -> float:
+        return self.ts[(self.count - 1) % self.capacity] if self.count else -np.inf
+
+    def append(self, ts: float, symbols: Sequence[str], rates: Sequence[float]):
+        # window() wymaga rosnących znaczników - powtórzony lub spóźniony tick (np. odświeżenie
+        # po powiadomieniu tuż po restore) jest już w buforze
+        if ts <= self.last_ts:
+            return
+        columns = self._columns_for(symbols)
+        position = self.count % self.capacity
+        self.ts[position] = ts
+        # Symbole nieobecne w tym ticku nie mogą zachować wartości sprzed capacity ticków
+        self.rates[position, :] = np.nan
+        self.rates[position, columns] = rates
+        self.count += 1
+
+    def window(self, symbol: str, seconds: float, now: float):
+        """Znaczniki czasu i kursy symbolu z ostatnich `seconds` sekund, chronologicznie."""
+        column = self.columns.get(symbol)
+        if column is None:
+            return None
+
+        filled = min(self.count, self.capacity)
+        order = (np.arange(filled) + (self.count - filled)) % self.capacity
+        ts = self.ts[order]
+        start = np.searchsorted(ts, now - seconds)
+        ts = ts[start:]
+        rates = self.rates[order[start:], column]
+
+        present = ~np.isnan(rates)
+        return ts[present], rates[present]
+
+    async def restore(self, db: AsyncSession, since: datetime):
+        """Odbudowuje bufor z historii ticków (indeks BRIN po ts) po starcie workera lub ponownym połączeniu."""
+        result = await db.execute(RESTORE_TICKS, {"since": since, "capacity": self.capacity})
+        history = result.all()
+
+        # Ticki dopisane w trakcie zapytania mogą być nowsze niż historia z bazy - zachowujemy je
+        filled = min(self.count, self.capacity)
+        order = (np.arange(filled) + (self.count - filled)) % self.capacity
+        kept_ts, kept_rates, kept_symbols = self.ts[order], self.rates[order], list(self.columns)
+
+        # Wspólna oś czasu wszystkich symboli, potem jedno przypisanie wektorowe na kolumnę
+        columns = [(np.frombuffer(ts, dtype=">f8"), np.frombuffer(rates, dtype=">f8")) for _, ts, rates in history]
+        axis = np.unique(np.concatenate([ts for ts, _ in columns])) if columns else np.empty(0)
+        self.ts = np.full(self.capacity, np.nan)
+        self.ts[:len(axis)] = axis
+        self.rates = np.full((self.capacity, len(columns)), np.nan, order="F")
+        for column, (ts, rates) in enumerate(columns):
+            self.rates[np.searchsorted(axis, ts), column] = rates
+        self.columns = {symbol: column for column, (symbol, _, _) in enumerate(history)}
+        self.count = len(axis)
+        self._last_symbols = self._last_columns = None
+
+        for ts, row in zip(kept_ts, kept_rates):
+            if ts > self.last_ts:
+                present = np.flatnonzero(~np.isnan(row))
+                self.append(float(ts), [kept_symbols[column] for column in present], row[present])
+
+def window_stats(ts: np.ndarray, rates: np.ndarray, now: float) -> Optional[dict]:
+    if len(rates) == 0:
+        return None
+
+    # Generator nie ma wolumenu - średnia ważona czasem obowiązywania kursu (TWAP)
+    durations = np.diff(ts, append=max(now, ts[-1]))
+    total = durations.sum()
+    twap = float(np.dot(rates, durations) / total) if total > 0 else float(rates[-1])
+
+    return {
+        "samples": int(len(rates)),
+        "from": datetime.fromtimestamp(ts[0], tz=timezone.utc),
+        "to": datetime.fromtimestamp(ts[-1], tz=timezone.utc),
+        "first": float(rates[0]),
+        "last": float(rates[-1]),
+        "min": float(rates.min()),
+        "max": float(rates.max()),
+        "mean": float(rates.mean()),
+        "stddev": float(rates.std()),
+        "twap": twap,
+        "change_pct": float((rates[-1] - rates[0]) / rates[0] * 100) if rates[0] else 0.0,
+    }
+
+
+tick_buffer = TickBuffer(TICK_BUFFER_SIZE)
@@ -0,0 +1,61 @@
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, List, Tuple
+
+import numpy as np
+from sqlalchemy import any_
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .history import CANDLE_RESOLUTIONS
+from .models import CurrencyCandle
+
+CHANGE_WINDOW_SECONDS = 24 * 3600
+# Próbki co 5 minut - pokrywają się ze świecami "5m", z których bufor jest odbudowywany
+CHANGE_RESOLUTION = "5m"
+
+
+class RollingReference:
+    """Kursy referencyjne sprzed 24h dla wszystkich walut generatora.
+
+    Jedna próbka (tablica kursów) na przedział czasu, w deque rosnącej po czasie.
+    Każdy tick dokłada co najwyżej jedną próbkę i zdejmuje przeterminowane
+    z lewej, więc odczyt referencji to samples[0] - O(1) zamortyzowane,
+    bez skanowania historii. Pamięć: 288 próbek * liczba walut * 8 bajtów.
+    """
+
+    def __init__(self, symbols: List[str]):
+        self.symbols = symbols
+        self.bucket_seconds = CANDLE_RESOLUTIONS[CHANGE_RESOLUTION]
+        self.samples: Deque[Tuple[float, np.ndarray]] = deque()
+
+    def update(self, now: float, rates: np.ndarray) -> np.ndarray:
+        bucket = now // self.bucket_seconds * self.bucket_seconds
+        if not self.samples or self.samples[-1][0] < bucket:
+            self.samples.append((bucket, rates.copy()))
+
+        # samples[0] to ostatnia próbka nie późniejsza niż now - 24h (albo najstarsza, jeśli historia jest krótsza)
+        horizon = now - CHANGE_WINDOW_SECONDS
+        while len(self.samples) > 1 and self.samples[1][0] <= horizon:
+            self.samples.popleft()
+        return self.samples[0][1]
+
+    async def restore(self, db: AsyncSession, now: float):
+        """Odbudowuje próbki z kursów otwarcia świec 5m z ostatnich 24h."""
+        since = datetime.fromtimestamp(now - CHANGE_WINDOW_SECONDS - self.bucket_seconds, tz=timezone.utc)
+        result = await db.execute(
+            select(CurrencyCandle.bucket, CurrencyCandle.symbol, CurrencyCandle.open)
+            .where(CurrencyCandle.resolution == CHANGE_RESOLUTION)
+            .where(CurrencyCandle.bucket >= since)
+            .where(CurrencyCandle.symbol == any_(self.symbols))
+            .order_by(CurrencyCandle.bucket)
+        )
+
+        columns = {symbol: index for index, symbol in enumerate(self.symbols)}
+        self.samples.clear()
+        for bucket, symbol, rate in result.all():
+            bucket = bucket.timestamp()
+            if not self.samples or self.samples[-1][0] != bucket:
+                # Waluty bez świecy w danym przedziale: nan, uzupełniane referencją z bazy
+                self.samples.append((bucket, np.full(len(self.symbols), np.nan)))
+            self.samples[-1][1][columns[symbol]] = rate
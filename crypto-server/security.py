@@ -0,0 +1,150 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+from .cache import TTLCache
+
+# Parametry scrypt (~16 MB pamięci, kilkadziesiąt ms CPU na jedno hashowanie)
+SCRYPT_N = int(os.getenv("SCRYPT_N", "16384"))
+SCRYPT_R = int(os.getenv("SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("SCRYPT_P", "1"))
+SCRYPT_DKLEN = 32
+HASH_PREFIX = "scrypt"
+
+# Granice parametrów akceptowanych w importowanych hashach - powyżej nich jedna weryfikacja
+# zajęłaby setki MB pamięci albo sekundy CPU
+SCRYPT_MAX_N = 2 ** 20
+SCRYPT_MAX_R = 32
+SCRYPT_MAX_P = 16
+# Pamięć jednej weryfikacji to ~128 * n * r bajtów
+SCRYPT_MAX_MEMORY = 64 * 1024 * 1024
+SCRYPT_MIN_SALT = 8
+SCRYPT_MIN_DKLEN = 16
+
+# 0 = hashowanie w pętli zdarzeń (tylko do porównań w benchmarkach)
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+VERIFIED_CACHE_TTL = float(os.getenv("VERIFIED_CACHE_TTL", "300"))
+VERIFIED_CACHE_SIZE = int(os.getenv("VERIFIED_CACHE_SIZE", "10000"))
+
+# hashlib.scrypt zwalnia GIL, więc pula wątków wystarcza do odciążenia pętli
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="secret-hash") if HASH_WORKERS > 0 else None
+
+# (client_id, sha256(secret)) -> hash z bazy, dla którego sekret został zweryfikowany
+verified_cache = TTLCache(maxsize=VERIFIED_CACHE_SIZE, ttl=VERIFIED_CACHE_TTL)
+
+# Trwające weryfikacje - równoległe żądania o ten sam sekret czekają na jeden wynik
+_in_flight: dict = {}
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def hash_secret(secret: str) -> str:
+    salt = os.urandom(16)
+    digest = hashlib.scrypt(
+        secret.encode("utf-8"), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P,
+        maxmem=256 * SCRYPT_N * SCRYPT_R, dklen=SCRYPT_DKLEN
+    )
+    return f"{HASH_PREFIX}${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+
+
+def is_hashed(stored: str) -> bool:
+    return stored.startswith(HASH_PREFIX + "$")
+
+
+def parse_hash(stored: str) -> Tuple[int, int, int, bytes, bytes]:
+    """Rozbiera hash "scrypt$n$r$p$salt$digest"; ValueError przy każdym nieprawidłowym polu."""
+    parts = stored.split("$")
+    if len(parts) != 6 or parts[0] != HASH_PREFIX:
+        raise ValueError("Oczekiwano formatu scrypt$n$r$p$salt$digest")
+
+    n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+    if n < 2 or n & (n - 1) or n > SCRYPT_MAX_N:
+        raise ValueError(f"n musi być potęgą 2 z zakresu 2..{SCRYPT_MAX_N}")
+    if not 1 <= r <= SCRYPT_MAX_R or not 1 <= p <= SCRYPT_MAX_P:
+        raise ValueError(f"r musi być z zakresu 1..{SCRYPT_MAX_R}, a p z zakresu 1..{SCRYPT_MAX_P}")
+    if 128 * n * r > SCRYPT_MAX_MEMORY:
+        raise ValueError(f"Parametry n i r wymagają ponad {SCRYPT_MAX_MEMORY // (1024 * 1024)} MB pamięci")
+
+    try:
+        salt = base64.b64decode(parts[4], validate=True)
+        digest = base64.b64decode(parts[5], validate=True)
+    except binascii.Error:
+        raise ValueError("Sól i skrót muszą być zakodowane w base64")
+    if len(salt) < SCRYPT_MIN_SALT or len(digest) < SCRYPT_MIN_DKLEN:
+        raise ValueError(f"Sól musi mieć co najmniej {SCRYPT_MIN_SALT} B, a skrót {SCRYPT_MIN_DKLEN} B")
+    return n, r, p, salt, digest
+
+
+def verify_secret(secret: str, stored: str) -> bool:
+    if not is_hashed(stored):
+        # Sekrety zapisane przed wprowadzeniem hashowania
+        return hmac.compare_digest(secret.encode("utf-8"), stored.encode("utf-8"))
+
+    # Uszkodzony lub zaimportowany hash z nieprawidłowymi parametrami to odmowa, a nie błąd 500
+    try:
+        n, r, p, salt, expected = parse_hash(stored)
+        digest = hashlib.scrypt(
+            secret.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+            maxmem=2 * SCRYPT_MAX_MEMORY, dklen=len(expected)
+        )
+    except (ValueError, MemoryError):
+        return False
+    return hmac.compare_digest(digest, expected)
+
+
+async def _run_in_pool(func, *args):
+    if _executor is None:
+        return func(*args)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, func, *args)
+
+
+async def hash_secret_async(secret: str) -> str:
+    return await _run_in_pool(hash_secret, secret)
+
+
+async def hash_secrets_async(secrets: List[str]) -> List[str]:
+    """Hashowanie wielu sekretów porcjami wielkości puli.
+
+    Zadania nie zapychają kolejki puli naraz, więc weryfikacje z /token
+    wchodzą pomiędzy porcje zamiast czekać na cały import.
+    """
+    batch = max(1, HASH_WORKERS)
+    hashes = []
+    for start in range(0, len(secrets), batch):
+        hashes.extend(await asyncio.gather(*[hash_secret_async(secret) for secret in secrets[start:start + batch]]))
+    return hashes
+
+
+def _verified_key(client_id: str, secret: str) -> tuple:
+    return (client_id, hashlib.sha256(secret.encode("utf-8")).hexdigest())
+
+
+async def verify_client_secret(client_id: str, secret: str, stored: str) -> bool:
+    """Weryfikacja sekretu klienta poza pętlą zdarzeń, z cache ostatnich udanych weryfikacji."""
+    key = _verified_key(client_id, secret)
+    if verified_cache.get(key) == stored:
+        return True
+
+    pending = _in_flight.get((key, stored))
+    if pending is not None:
+        return await asyncio.shield(pending)
+
+    pending = asyncio.ensure_future(_run_in_pool(verify_secret, secret, stored))
+    _in_flight[(key, stored)] = pending
+    try:
+        valid = await asyncio.shield(pending)
+    finally:
+        _in_flight.pop((key, stored), None)
+
+    if valid and VERIFIED_CACHE_TTL > 0:
+        verified_cache.set(key, stored)
+    return valid
@@ -0,0 +1,55 @@
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime
+from email.utils import format_datetime
+from types import MappingProxyType
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class RateSnapshot:
+    """Niezmienny stan kursów po jednym ticku generatora.
+
+    Wiersze są już zserializowane do JSON, więc odczyt nie wymaga ani
+    zapytania do bazy, ani ponownej serializacji.
+    """
+    version: int
+    last_updated: datetime
+    # symbol -> JSON pojedynczego wiersza, w kolejności listy
+    rows: Mapping[str, bytes]
+    # JSON pełnej listy
+    body: bytes
+    # Nagłówki walidacji warunkowej (ETag / Last-Modified) dla pełnej listy
+    etag: str
+    last_modified: str
+    # (ETag wariantu, kodowanie) -> zadanie kompresji (wynik: bajty); żyje tyle co snapshot, czyli do następnego ticku
+    compressed: Dict[Tuple[str, str], "asyncio.Future[bytes]"] = field(default_factory=dict, compare=False, repr=False)
+
+    def select(self, symbols: Iterable[str]) -> bytes:
+        return b"[" + b",".join(self.rows[symbol] for symbol in symbols if symbol in self.rows) + b"]"
+
+
+class SnapshotStore:
+    def __init__(self):
+        self._current: Optional[RateSnapshot] = None
+
+    @property
+    def current(self) -> Optional[RateSnapshot]:
+        return self._current
+
+    def publish(self, version: int, last_updated: datetime, rows: Iterable[Tuple[str, bytes]]) -> RateSnapshot:
+        rows = dict(rows)
+        snapshot = RateSnapshot(
+            version=version,
+            last_updated=last_updated,
+            rows=MappingProxyType(rows),
+            body=b"[" + b",".join(rows.values()) + b"]",
+            etag=f'"{version}"',
+            last_modified=format_datetime(last_updated, usegmt=True),
+        )
+        # Podmiana referencji - czytelnicy widzą stary albo nowy stan, nigdy pośredni
+        self._current = snapshot
+        return snapshot
+
+
+rate_snapshot = SnapshotStore()
@@ -0,0 +1,77 @@
+import asyncio
+import os
+from typing import Dict, FrozenSet, Optional, Set
+
+from .snapshot import RateSnapshot
+
+# Maksymalna liczba ramek czekających na wysłanie do jednego klienta
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "8"))
+
+# Znacznik w kolejce: klient nie nadążał, wyślij mu aktualny stan zamiast zaległych delt
+RESYNC = None
+
+
+class Subscription:
+    def __init__(self):
+        self.symbols: FrozenSet[str] = frozenset()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=WS_QUEUE_SIZE)
+        self.dropped = 0
+
+    def push(self, frame: Optional[str]):
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # Drop-to-latest: zaległe delty są bezwartościowe, liczy się bieżący stan
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.dropped += 1
+            self.queue.put_nowait(RESYNC)
+
+
+def encode_frame(frame_type: str, snapshot: RateSnapshot, symbols) -> str:
+    header = f'{{"type":"{frame_type}","version":{snapshot.version},"rates":'.encode()
+    return (header + snapshot.select(symbols) + b"}").decode()
+
+
+class RateHub:
+    """Rozsyła zmiany kursów po każdym ticku do subskrybentów WebSocket.
+
+    Ramka jest kodowana raz na każdy różny zbiór subskrybowanych symboli,
+    a nie osobno dla każdego połączenia.
+    """
+
+    def __init__(self):
+        self.subscriptions: Set[Subscription] = set()
+
+    def register(self) -> Subscription:
+        subscription = Subscription()
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unregister(self, subscription: Subscription):
+        self.subscriptions.discard(subscription)
+
+    def broadcast(self, previous: Optional[RateSnapshot], snapshot: RateSnapshot):
+        if not self.subscriptions:
+            return
+
+        if previous is None:
+            changed = frozenset(snapshot.rows)
+        else:
+            changed = frozenset(
+                symbol for symbol, row in snapshot.rows.items() if previous.rows.get(symbol) != row
+            )
+
+        frames: Dict[FrozenSet[str], Optional[str]] = {}
+        for subscription in list(self.subscriptions):
+            symbols = subscription.symbols
+            if symbols not in frames:
+                delta = [symbol for symbol in snapshot.rows if symbol in symbols and symbol in changed]
+                frames[symbols] = encode_frame("delta", snapshot, delta) if delta else None
+
+            frame = frames[symbols]
+            if frame is not None:
+                subscription.push(frame)
+
+
+rate_hub = RateHub()
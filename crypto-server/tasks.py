@@ -1,64 +1,147 @@
 import asyncio
-import random
+import os
+import time
+from datetime import datetime, timezone
+from typing import List
+
+import numpy as np
+from sqlalchemy import text
 from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .currency import publish_rates
 from .database import AsyncSessionLocal
+from .history import record_ticks
 from .models import CurrencyRate
+from .notify import RATES_CHANNEL, notify, rates_payload
+from .ringbuffer import tick_buffer
+from .rolling import RollingReference
 
-async def currency_generator():
-    async with AsyncSessionLocal() as db:
-        print("🌱 Sprawdzanie i seedowanie walut...")
-
-        initial_currencies = [
-            {"symbol": "BTC", "rate": 45000.0},
-            {"symbol": "ETH", "rate": 3200.0},
-            {"symbol": "SOL", "rate": 144.0},
-            {"symbol": "XRP", "rate": 0.55},
-            {"symbol": "ADA", "rate": 0.50},
-            {"symbol": "DOT", "rate": 7.20},
-            {"symbol": "LINK", "rate": 14.50},
-            {"symbol": "LTC", "rate": 70.00},
-            {"symbol": "BCH", "rate": 250.00},
-            {"symbol": "XLM", "rate": 0.12},
-            {"symbol": "UNI", "rate": 6.50},
-            {"symbol": "DOGE", "rate": 0.08},
-            {"symbol": "AVAX", "rate": 35.00},
-        ]
-
-        new_currencies = []
-        for curr_data in initial_currencies:
-            result = await db.execute(select(CurrencyRate).where(CurrencyRate.symbol == curr_data["symbol"]))
-            if not result.scalars().first():
-                print(f"   ➕ Dodawanie nowej waluty: {curr_data['symbol']}")
-                new_currencies.append(
-                    CurrencyRate(
-                        symbol=curr_data["symbol"],
-                        rate=curr_data["rate"],
-                        open_price=curr_data["rate"],
-                        change_24h=0.0
-                    )
-                )
-
-        if new_currencies:
-            db.add_all(new_currencies)
-            await db.commit()
-            print(f"✅ Dodano {len(new_currencies)} nowych walut.")
+CURRENCY_TICK_INTERVAL = float(os.getenv("CURRENCY_TICK_INTERVAL", "3"))
+# Maksymalna zmiana kursu w jednym ticku (+/- 0.5%)
+CURRENCY_TICK_SPREAD = 0.005
 
-        print("🚀 Start generatora kursów (Persistent DB Mode)!")
+# Jedno zapytanie na tick niezależnie od liczby walut - parametrami są całe tablice
+BULK_UPDATE_RATES = text("""
+    UPDATE currency_rates_live AS c
+    SET rate = v.rate, open_price = v.open_price, change_24h = v.change_24h, last_updated = :ts
+    FROM unnest(
+        CAST(:symbols AS text[]), CAST(:rates AS float8[]),
+        CAST(:open_prices AS float8[]), CAST(:changes AS float8[])
+    ) AS v(symbol, rate, open_price, change_24h)
+    WHERE c.symbol = v.symbol
+""")
+
+
+class RateWalk:
+    """Stan generatora w tablicach NumPy - krok błądzenia losowego liczy wszystkie waluty naraz."""
+
+    def __init__(self, symbols: List[str], rates, open_prices, changes_24h):
+        self.symbols = symbols
+        self.rates = np.asarray(rates, dtype=np.float64)
+        open_prices = np.asarray(open_prices, dtype=np.float64)
+        # Brak kursu otwarcia (NULL -> nan) - przyjmujemy bieżący kurs
+        self.open_prices = np.where(np.isnan(open_prices), self.rates, open_prices)
+        self.change_24h = np.nan_to_num(np.asarray(changes_24h, dtype=np.float64))
+        self.reference = RollingReference(symbols)
+        self.rng = np.random.default_rng()
+
+    def step(self, now: float):
+        self.rates *= 1 + self.rng.uniform(-CURRENCY_TICK_SPREAD, CURRENCY_TICK_SPREAD, len(self.rates))
+
+        # open_price to kurs sprzed 24h; nan = brak próbki dla waluty, zostaje poprzednia wartość
+        reference = self.reference.update(now, self.rates)
+        self.open_prices = np.where(np.isnan(reference), self.open_prices, reference)
+
+        positive = self.open_prices > 0
+        self.change_24h[positive] = (self.rates[positive] - self.open_prices[positive]) / self.open_prices[positive] * 100
 
-        while True:
-            result = await db.execute(select(CurrencyRate))
-            rates = result.scalars().all()
 
-            for currency in rates:
-                if currency.open_price is None:
-                    currency.open_price = currency.rate
+INITIAL_CURRENCIES = [
+    {"symbol": "BTC", "rate": 45000.0},
+    {"symbol": "ETH", "rate": 3200.0},
+    {"symbol": "SOL", "rate": 144.0},
+    {"symbol": "XRP", "rate": 0.55},
+    {"symbol": "ADA", "rate": 0.50},
+    {"symbol": "DOT", "rate": 7.20},
+    {"symbol": "LINK", "rate": 14.50},
+    {"symbol": "LTC", "rate": 70.00},
+    {"symbol": "BCH", "rate": 250.00},
+    {"symbol": "XLM", "rate": 0.12},
+    {"symbol": "UNI", "rate": 6.50},
+    {"symbol": "DOGE", "rate": 0.08},
+    {"symbol": "AVAX", "rate": 35.00},
+]
 
-                change_percent = random.uniform(-0.005, 0.005)
-                currency.rate = currency.rate * (1 + change_percent)
+# Jedno zapytanie niezależnie od długości listy; istniejące waluty zostają nietknięte
+SEED_CURRENCIES = text("""
+    INSERT INTO currency_rates_live (symbol, rate, open_price, change_24h)
+    SELECT symbol, rate, rate, 0.0 FROM unnest(CAST(:symbols AS text[]), CAST(:rates AS float8[])) AS v(symbol, rate)
+    ON CONFLICT (symbol) DO NOTHING
+    RETURNING symbol
+""")
 
-                if currency.open_price > 0:
-                    currency.change_24h = ((currency.rate - currency.open_price) / currency.open_price) * 100
 
+async def seed_currencies(db: AsyncSession):
+    result = await db.execute(SEED_CURRENCIES, {
+        "symbols": [currency["symbol"] for currency in INITIAL_CURRENCIES],
+        "rates": [currency["rate"] for currency in INITIAL_CURRENCIES],
+    })
+    added = result.scalars().all()
+    await db.commit()
+    if added:
+        print(f"✅ Dodano {len(added)} nowych walut: {', '.join(added)}")
+
+
+async def load_rate_walk(db: AsyncSession, symbol_prefix: str = "") -> RateWalk:
+    result = await db.execute(
+        select(CurrencyRate.symbol, CurrencyRate.rate, CurrencyRate.open_price, CurrencyRate.change_24h)
+        .where(CurrencyRate.symbol.startswith(symbol_prefix))
+        .order_by(CurrencyRate.id)
+    )
+    rows = result.all()
+    walk = RateWalk(
+        [row.symbol for row in rows],
+        [row.rate for row in rows],
+        [row.open_price if row.open_price is not None else np.nan for row in rows],
+        [row.change_24h if row.change_24h is not None else np.nan for row in rows],
+    )
+    await walk.reference.restore(db, time.time())
+    return walk
+
+
+async def write_tick(db: AsyncSession, walk: RateWalk, now: datetime):
+    """Zapisuje stan po kroku: kursy, historię ticków i świece. Bez commita."""
+    rates = walk.rates.tolist()
+    await db.execute(BULK_UPDATE_RATES, {
+        "ts": now,
+        "symbols": walk.symbols,
+        "rates": rates,
+        "open_prices": walk.open_prices.tolist(),
+        "changes": walk.change_24h.tolist(),
+    })
+    await record_ticks(db, walk.symbols, rates, now)
+
+
+async def currency_generator():
+    async with AsyncSessionLocal() as db:
+        await seed_currencies(db)
+
+        walk = await load_rate_walk(db)
+        print(f"🚀 Start generatora kursów (Persistent DB Mode, {len(walk.symbols)} walut)!")
+
+        while True:
+            now = datetime.now(timezone.utc)
+            # Wersja to czas ticku w ms - pozostałe workery odtwarzają ją z last_updated
+            version = int(now.timestamp() * 1000)
+            walk.step(now.timestamp())
+            await write_tick(db, walk, now)
+            # Każdy tick zmienia wszystkie waluty
+            await notify(db, RATES_CHANNEL, rates_payload(version, walk.symbols))
             await db.commit()
 
-            await asyncio.sleep(3)
+            symbols, rates = walk.symbols, walk.rates.tolist()
+            publish_rates(symbols, rates, walk.change_24h.tolist(), version, now)
+            tick_buffer.append(now.timestamp(), symbols, walk.rates)
+
+            await asyncio.sleep(CURRENCY_TICK_INTERVAL)
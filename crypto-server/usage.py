@@ -0,0 +1,81 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy.dialects.postgresql import insert
+
+from .database import AsyncSessionLocal
+from .models import ClientUsage
+
+USAGE_FLUSH_INTERVAL = float(os.getenv("USAGE_FLUSH_INTERVAL", "10"))
+# 4 parametry na wiersz - mieści się w limicie parametrów asyncpg
+USAGE_FLUSH_CHUNK = 8000
+
+USAGE_TOKEN = "token"
+USAGE_CURRENCY = "currency"
+
+
+class UsageCounters:
+    """Liczniki wywołań w pamięci, agregowane do minutowych kubełków.
+
+    Zwiększane wyłącznie z pętli zdarzeń, więc nie potrzebują blokad;
+    flush podmienia cały słownik jednym przypisaniem.
+    """
+
+    def __init__(self):
+        self._counts: dict = {}
+
+    def increment(self, client_id: str, kind: str):
+        key = (client_id, kind, int(time.time()) // 60)
+        self._counts[key] = self._counts.get(key, 0) + 1
+
+    def drain(self) -> dict:
+        counts, self._counts = self._counts, {}
+        return counts
+
+    def restore(self, counts: dict):
+        for key, value in counts.items():
+            self._counts[key] = self._counts.get(key, 0) + value
+
+
+usage_counters = UsageCounters()
+
+
+async def flush_usage():
+    counts = usage_counters.drain()
+    if not counts:
+        return
+
+    rows = [
+        {
+            "client_id": client_id,
+            "kind": kind,
+            "bucket": datetime.fromtimestamp(minute * 60, tz=timezone.utc),
+            "count": count,
+        }
+        for (client_id, kind, minute), count in counts.items()
+    ]
+
+    try:
+        async with AsyncSessionLocal() as db:
+            for start in range(0, len(rows), USAGE_FLUSH_CHUNK):
+                statement = insert(ClientUsage).values(rows[start:start + USAGE_FLUSH_CHUNK])
+                await db.execute(statement.on_conflict_do_update(
+                    index_elements=["client_id", "kind", "bucket"],
+                    set_={"count": ClientUsage.count + statement.excluded.count},
+                ))
+            await db.commit()
+    except Exception:
+        # Nie gubimy liczników - trafią do następnego flusha
+        usage_counters.restore(counts)
+        raise
+
+
+async def usage_flusher():
+    while True:
+        await asyncio.sleep(USAGE_FLUSH_INTERVAL)
+        try:
+            await flush_usage()
+        except Exception as e:
+            print(f"⚠️  Błąd zapisu statystyk użycia: {e}")